@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AudioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'audio'
+
+    def ready(self):
+        from audio import signals
+        signals.connect()
@@ -0,0 +1,35 @@
+import os
+from contextlib import contextmanager
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+
+
+class CounterFileBasedCache(FileBasedCache):
+    """
+    Файловый кэш для счетчиков, общих для процессов сервера и воркеров.
+    В FileBasedCache add и incr — чтение и запись без блокировки, и одновременные
+    обращения теряют отсчеты; здесь они выполняются под блокировкой файла
+    в каталоге кэша. Остальные операции не меняются.
+    """
+
+    LOCK_FILENAME = 'counters.lock'
+
+    @contextmanager
+    def counter_lock(self):
+        os.makedirs(self._dir, exist_ok=True)
+        # Файл блокировки не оканчивается на .djcache: clear() и вытеснение его не трогают
+        with open(os.path.join(self._dir, self.LOCK_FILENAME), 'ab') as f:
+            locks.lock(f, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(f)
+
+    def add(self, *args, **kwargs):
+        with self.counter_lock():
+            return super().add(*args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        with self.counter_lock():
+            return super().incr(*args, **kwargs)
@@ -1,5 +1,6 @@
 import django_filters
-from .models import CommissionMember, DefenseSchedule, Protocol, Project, Student, Commission
+from .models import CommissionMember, DefenseSchedule, Protocol, Project, Student, Commission, Question, TranscriptSegment
+from .search import full_text_search, name_query, name_vector, text_query, text_vector
 from django_filters import rest_framework as filters
 from audio.models import Student, DefenseSchedule
 from django.db.models import Q
@@ -55,6 +56,7 @@ class StudentFilter(filters.FilterSet):
         lookup_expr='exact',
         label='Grade'
     )
+    search = filters.CharFilter(method='filter_search', label='Поиск по ФИО')
 
     class Meta:
         model = Student
@@ -64,6 +66,32 @@ class StudentFilter(filters.FilterSet):
             'ID_Specialization': ['exact'],  # Фильтрация остается, но поле не выводится
         }
 
+    def filter_search(self, queryset, name, value):
+        return full_text_search(queryset, name_vector(), name_query(value))
+
+
+class QuestionFilter(filters.FilterSet):
+    search = filters.CharFilter(method='filter_search', label='Полнотекстовый поиск')
+
+    class Meta:
+        model = Question
+        fields = ['ID_Project']
+
+    def filter_search(self, queryset, name, value):
+        # Текст вопросов лемматизирован, поэтому запрос тоже приводится к основам слов
+        return full_text_search(queryset, text_vector(), text_query(value))
+
+
+class TranscriptSegmentFilter(filters.FilterSet):
+    search = filters.CharFilter(method='filter_search', label='Полнотекстовый поиск')
+
+    class Meta:
+        model = TranscriptSegment
+        fields = ['ID_Project']
+
+    def filter_search(self, queryset, name, value):
+        return full_text_search(queryset, text_vector(), text_query(value))
+
 from django_filters import rest_framework as filters
 
 class CommissionFilter(filters.FilterSet):
@@ -99,6 +127,7 @@ class CommissionFilter(filters.FilterSet):
 
 class ProtocolFilter(django_filters.FilterSet):
     student_fio = django_filters.CharFilter(method='filter_by_student_fio')
+    search = django_filters.CharFilter(method='filter_search', label='Поиск по ФИО студента')
 
     class Meta:
         model = Protocol
@@ -120,4 +149,12 @@ class ProtocolFilter(django_filters.FilterSet):
                     Q(ID_Student__Patronymic__icontains=word)
             )
 
-        return queryset.filter(q_objects)
\ No newline at end of file
+        return queryset.filter(q_objects)
+
+    def filter_search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+
+        # Все слова должны совпасть с началом фамилии, имени или отчества.
+        # Поиск идет по GIN-индексу student_name_search, а не перебором icontains
+        return full_text_search(queryset, name_vector('ID_Student__'), name_query(value))
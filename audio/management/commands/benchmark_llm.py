@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from audio.services.LLMProcessor_service import LLMProcessor
+
+SAMPLE_TEXT = (
+    "Добрый день, уважаемая комиссия. Тема нашего проекта — автоматизация протоколов защиты. "
+    "Мы используем Django и PostgreSQL для хранения данных, а распознавание речи выполняет Whisper. "
+    "Почему вы выбрали именно эту модель распознавания? Как вы оценивали качество расшифровки? "
+    "Какие ограничения есть у вашего решения при работе с длинными записями? "
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет потоковую генерацию вопросов LLM по окнам на расшифровках разной длины: "
+        "число окон, токены, токены в секунду и общую задержку."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help='Файл с расшифровкой (по умолчанию — повторяющийся пример)')
+        parser.add_argument(
+            '--lengths', default='3000,12000,48000',
+            help='Длины расшифровки в символах через запятую',
+        )
+
+    def handle(self, *args, **options):
+        if options['file']:
+            with open(options['file'], encoding='utf-8') as f:
+                source = f.read()
+        else:
+            source = SAMPLE_TEXT
+        if not source.strip():
+            raise CommandError("Empty transcript")
+
+        lengths = [int(length) for length in options['lengths'].split(',')]
+        processor = LLMProcessor.get_instance()
+
+        self.stdout.write(
+            f"{'chars':>8} {'windows':>8} {'prompt':>8} {'output':>8} {'tok/s':>8} {'latency, s':>11} {'questions':>10}"
+        )
+        for length in lengths:
+            text = (source * (length // len(source) + 1))[:length]
+            # Мимо кэша результатов: замеряется сама генерация
+            try:
+                questions = list(processor._stream_questions(text, processor.config['max_questions']))
+            except RuntimeError as e:
+                raise CommandError(f"Generation failed: {e}")
+            stats = processor.last_stats
+            self.stdout.write(
+                f"{stats['chars']:>8} {stats['windows']:>8} {stats['prompt_tokens']:>8} "
+                f"{stats['completion_tokens']:>8} {stats['tokens_per_sec'] or 0:>8} "
+                f"{stats['latency_sec']:>11} {len(questions):>10}"
+            )
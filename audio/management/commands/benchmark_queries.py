@@ -0,0 +1,109 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from audio.models import (
+    Commission,
+    CommissionComposition,
+    CommissionMember,
+    DefenseSchedule,
+    Group,
+    Institute,
+    Project,
+    Protocol,
+    Question,
+    Specialization,
+    Student,
+)
+
+ENDPOINTS = ['/api/protocols/', '/api/students/', '/api/defenses/', '/api/commissions/']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Считает SQL-запросы и время ответа списочных API на тестовых данных "
+        "разного размера. Данные создаются в транзакции и откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='1,10,100',
+            help='Число протоколов (и студентов) через запятую',
+        )
+        parser.add_argument(
+            '--endpoints', default=','.join(ENDPOINTS),
+            help='Адреса списков через запятую',
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        endpoints = options['endpoints'].split(',')
+
+        self.stdout.write(f"{'endpoint':<22} {'protocols':>10} {'queries':>8} {'time, ms':>9}")
+        for size in sizes:
+            try:
+                with transaction.atomic():
+                    self.create_data(size)
+                    for endpoint in endpoints:
+                        queries, elapsed = self.measure(endpoint)
+                        self.stdout.write(f"{endpoint:<22} {size:>10} {queries:>8} {elapsed:>9.1f}")
+                    raise Rollback()
+            except Rollback:
+                pass
+
+    def measure(self, endpoint):
+        client = APIClient()
+        # Измеряем сами запросы к БД, без кэша ответов
+        with override_settings(RESPONSE_CACHE_ENABLED=False), CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = client.get(endpoint)
+            elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            self.stderr.write(f"{endpoint}: HTTP {response.status_code}")
+        return len(context.captured_queries), elapsed
+
+    def create_data(self, size):
+        institute = Institute.objects.create(Name="Бенчмарк")
+        group = Group.objects.create(Name="БМ-01", ID_Institute=institute)
+        specialization = Specialization.objects.create(Name="Бенчмарк", Qualification="Бенчмарк")
+        commission = Commission.objects.create(Name="Бенчмарк")
+        CommissionComposition.objects.bulk_create([
+            CommissionComposition(
+                ID_Commission=commission,
+                ID_Member=CommissionMember.objects.create(Surname=f"Членов{index}", Name="Член", Patronymic="Членович"),
+                Role="Секретарь" if index == 0 else "Член комиссии",
+            )
+            for index in range(3)
+        ])
+        schedules = [
+            DefenseSchedule.objects.create(
+                DateTime=timezone.make_aware(datetime(2025, 6, 20 + index, 10, 0)), ID_Commission=commission
+            )
+            for index in range(3)
+        ]
+
+        project = Project.objects.create(Title="Бенчмарк", Supervisor="Бенчмарк", Status="Готов")
+        question = Question.objects.create(Text="вопрос", ID_Project=project)
+        students = Student.objects.bulk_create([
+            Student(
+                Surname=f"Студентов{index}", Name="Студент", Patronymic="Студентович",
+                ID_Group=group, ID_Specialization=specialization, ID_Project=project,
+            )
+            for index in range(size)
+        ])
+        Protocol.objects.bulk_create([
+            Protocol(
+                Year=2025, Grade="5", ID_Question=question, ID_Student=student,
+                ID_DefenseSchedule=schedules[index % len(schedules)], Number=str(index), Status=True,
+            )
+            for index, student in enumerate(students)
+        ])
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from audio.services.response_cache_service import ResponseCacheService
+
+
+class Command(BaseCommand):
+    help = "Попадания в кэш ответов API по вьюсетам (hits / misses / доля попаданий)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Обнулить счетчики после вывода')
+
+    def handle(self, *args, **options):
+        stats = ResponseCacheService.stats()
+        if not stats:
+            self.stdout.write("No cached views yet")
+
+        self.stdout.write(f"{'view':<34} {'hits':>8} {'misses':>8} {'hit ratio':>10}")
+        for view_name, view_stats in sorted(stats.items()):
+            ratio = view_stats['hit_ratio']
+            self.stdout.write(
+                f"{view_name:<34} {view_stats['hits']:>8} {view_stats['misses']:>8} "
+                f"{'-' if ratio is None else ratio:>10}"
+            )
+
+        if options['reset']:
+            ResponseCacheService.reset_stats()
+            self.stdout.write("Counters reset")
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Модули, которые не должны загружаться в веб-процессах и командах manage.py
+HEAVY_MODULES = ['torch', 'whisper', 'spacy', 'thinc', 'numba', 'llama_cpp', 'vosk', 'transformers']
+
+STARTUP_CODE = (
+    "import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns; "
+    "{extra}"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Запускает python -X importtime для старта веб-процесса (django.setup() и все URL) "
+        "и проверяет, что тяжелые ML-зависимости при этом не импортируются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15, help='Сколько самых долгих импортов показать')
+        parser.add_argument(
+            '--module', action='append', default=[],
+            help='Дополнительно импортировать модуль (например, audio.task)',
+        )
+
+    def handle(self, *args, **options):
+        extra = "; ".join(f"import {module}" for module in options['module'])
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'myproject.settings'))
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE.format(extra=extra)],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode != 0:
+            raise CommandError(f"Startup failed:\n{process.stderr[-2000:]}")
+
+        imports = self.parse_importtime(process.stderr)
+        total_us = sum(self_us for _, self_us, _ in imports)
+
+        self.stdout.write(f"Imported modules: {len(imports)}, total import time: {total_us / 1000:.1f} ms")
+        self.stdout.write(f"{'cumulative, ms':>15} {'self, ms':>10}  module")
+        top_level = [item for item in imports if '.' not in item[0]]
+        for name, self_us, cumulative_us in sorted(top_level, key=lambda item: -item[2])[:options['top']]:
+            self.stdout.write(f"{cumulative_us / 1000:>15.1f} {self_us / 1000:>10.1f}  {name}")
+
+        loaded = {name.split('.')[0] for name, _, _ in imports}
+        heavy = [module for module in HEAVY_MODULES if module in loaded]
+        if heavy:
+            raise CommandError(f"Heavy modules imported at startup: {', '.join(heavy)}")
+        self.stdout.write(self.style.SUCCESS("No heavy ML modules imported at startup"))
+
+    @staticmethod
+    def parse_importtime(stderr):
+        # Формат строки: "import time:       self |  cumulative | module"
+        imports = []
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or 'imported package' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            imports.append((name.strip(), int(self_us), int(cumulative_us)))
+        return imports
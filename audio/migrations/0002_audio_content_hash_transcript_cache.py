@@ -0,0 +1,33 @@
+# Generated by Django 4.2.16 on 2026-10-18 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audio', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('model_version', models.CharField(max_length=255)),
+                ('text', models.TextField()),
+                ('questions', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='audiofile',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='transcriptcache',
+            constraint=models.UniqueConstraint(fields=('content_hash', 'model_version'), name='unique_transcript_cache'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.16 on 2026-10-18 19:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audio', '0004_upload_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcriptcache',
+            name='question_segments',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='transcriptcache',
+            name='segments',
+            field=models.JSONField(default=list),
+        ),
+        migrations.CreateModel(
+            name='TranscriptSegment',
+            fields=[
+                ('ID', models.AutoField(primary_key=True, serialize=False)),
+                ('Start', models.FloatField()),
+                ('End', models.FloatField()),
+                ('Text', models.TextField()),
+                ('Confidence', models.FloatField(blank=True, null=True)),
+                ('Words', models.JSONField(default=list)),
+                ('ID_Project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='audio.project')),
+            ],
+            options={
+                'db_table': 'TranscriptSegment',
+            },
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='ID_Segment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='audio.transcriptsegment'),
+        ),
+        migrations.AddIndex(
+            model_name='transcriptsegment',
+            index=models.Index(fields=['ID_Project', 'Start'], name='transcript_segment_start'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.16 on 2026-10-18 19:15
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audio', '0005_transcript_segment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('Text', config='russian'), name='question_text_search'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('Surname', 'Name', 'Patronymic', config='simple'), name='student_name_search'),
+        ),
+        migrations.AddIndex(
+            model_name='transcriptsegment',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('Text', config='russian'), name='transcript_segment_search'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.16 on 2026-10-18 19:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audio', '0007_table_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudioJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.CharField(max_length=255, unique=True)),
+                ('content_hash', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('waiting', 'Waiting'), ('done', 'Done'), ('failed', 'Failed')], default='running', max_length=10)),
+                ('questions', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='audio.project')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='audiojob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['running', 'waiting', 'done']), models.Q(('content_hash', ''), _negated=True)), fields=('project', 'content_hash'), name='unique_active_audio_job'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-18 19:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audio', '0008_audio_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questiongenerationjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='questiongenerationjob',
+            name='worker',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
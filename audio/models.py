@@ -1,13 +1,117 @@
+import uuid
+
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
+from audio.search import name_vector, text_vector
+
 class AudioFile(models.Model):
     audio = models.FileField(upload_to='audio/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
 
     def __str__(self):
         return self.audio.name
 
 
+class TranscriptCache(models.Model):
+    content_hash = models.CharField(max_length=64)
+    model_version = models.CharField(max_length=255)
+    text = models.TextField()
+    questions = models.JSONField(default=list)  # лемматизированные вопросы, как в Question.Text
+    segments = models.JSONField(default=list)  # сегменты расшифровки со временем
+    question_segments = models.JSONField(default=list)  # номер сегмента для каждого вопроса
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['content_hash', 'model_version'], name='unique_transcript_cache'),
+        ]
+
+    def __str__(self):
+        return self.content_hash
+
+
+class AudioJob(models.Model):
+    # Обработка записи для проекта. По ней повторная загрузка той же записи в проект
+    # не дублирует вопросы, а загрузка во время идущей обработки ждет ее результат
+    class Status(models.TextChoices):
+        RUNNING = 'running'
+        WAITING = 'waiting'  # ждет результат обработки той же записи для другого проекта
+        DONE = 'done'
+        FAILED = 'failed'
+
+    job_id = models.CharField(max_length=255, unique=True)
+    project = models.ForeignKey('Project', on_delete=models.CASCADE)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.RUNNING)
+    questions = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['project', 'content_hash'],
+                condition=models.Q(status__in=['running', 'waiting', 'done']) & ~models.Q(content_hash=''),
+                name='unique_active_audio_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.job_id} - {self.status}"
+
+
+class QuestionGenerationJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending'
+        RUNNING = 'running'
+        DONE = 'done'
+        FAILED = 'failed'
+
+    project = models.ForeignKey('Project', on_delete=models.CASCADE)
+    text = models.TextField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING, db_index=True)
+    questions = models.JSONField(default=list)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=255, blank=True)  # host:pid процесса, выполняющего задание
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # обновляется с каждым вопросом
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.project_id} - {self.status}"
+
+
+class UploadSession(models.Model):
+    class Status(models.TextChoices):
+        OPEN = 'open'
+        COMPLETED = 'completed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey('Project', on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)  # сколько байт подряд с начала файла уже записано
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.OPEN)
+    audio_file = models.ForeignKey(AudioFile, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.filename} {self.received}/{self.size}"
+
+
+class TableVersion(models.Model):
+    # Версия данных таблицы для ETag: увеличивается при каждом изменении (audio.signals)
+    table = models.CharField(max_length=100, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.table} v{self.version}"
+
+
 class Specialization(models.Model):
     ID = models.AutoField(primary_key=True)
     Name = models.TextField(unique=True)
@@ -62,6 +166,9 @@ class Student(models.Model):
 
     class Meta:
         db_table = 'Student'
+        indexes = [
+            GinIndex(name_vector(), name='student_name_search'),
+        ]
 
     def __str__(self):
         return f"{self.Surname} {self.Name} {self.Patronymic}"
@@ -85,13 +192,37 @@ class Project(models.Model):
         return self.Title
 
 
+class TranscriptSegment(models.Model):
+    ID = models.AutoField(primary_key=True)
+    ID_Project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    Start = models.FloatField()  # секунды от начала записи
+    End = models.FloatField()
+    Text = models.TextField()
+    Confidence = models.FloatField(null=True, blank=True)  # exp(avg_logprob) Whisper, 0..1
+    Words = models.JSONField(default=list)  # [{"word", "start", "end", "probability"}]
+
+    class Meta:
+        db_table = 'TranscriptSegment'
+        indexes = [
+            models.Index(fields=['ID_Project', 'Start'], name='transcript_segment_start'),
+            GinIndex(text_vector(), name='transcript_segment_search'),
+        ]
+
+    def __str__(self):
+        return f"{self.Start:.1f}-{self.End:.1f} {self.Text}"
+
+
 class Question(models.Model):
     ID = models.AutoField(primary_key=True)
     Text = models.TextField()
     ID_Project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    ID_Segment = models.ForeignKey(TranscriptSegment, on_delete=models.SET_NULL, null=True, blank=True)
 
     class Meta:
         db_table = 'Question'
+        indexes = [
+            GinIndex(text_vector(), name='question_text_search'),
+        ]
 
     def __str__(self):
         return self.Text
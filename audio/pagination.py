@@ -0,0 +1,25 @@
+from rest_framework.pagination import CursorPagination
+
+
+class OptionalCursorPagination(CursorPagination):
+    """
+    Постраничная выдача по курсору (keyset по первичному ключу): страница
+    выбирается условием ID > последнего, без OFFSET, и не "съезжает" при вставках.
+
+    Включается только параметрами ?page_size= или ?cursor=, без них список
+    отдается целиком, как раньше. Результаты поиска (?search=) не разбиваются:
+    они упорядочены по релевантности, а не по ID.
+    """
+
+    ordering = 'pk'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if 'search' in params:
+            return None
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,42 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+# Текст вопросов и расшифровок ищем со стеммингом, ФИО — по префиксам слов без
+# стемминга ("иван" находит "Иванов"). Выражения здесь совпадают с выражениями
+# GIN-индексов в models.py, иначе PostgreSQL не сможет использовать индекс
+TEXT_SEARCH_CONFIG = 'russian'
+NAME_SEARCH_CONFIG = 'simple'
+NAME_FIELDS = ('Surname', 'Name', 'Patronymic')
+
+WORD_RE = re.compile(r'\w+')
+
+
+def text_vector(field='Text'):
+    return SearchVector(field, config=TEXT_SEARCH_CONFIG)
+
+
+def name_vector(prefix=''):
+    return SearchVector(*[f"{prefix}{field}" for field in NAME_FIELDS], config=NAME_SEARCH_CONFIG)
+
+
+def text_query(value):
+    # websearch: кавычки для фраз, "-" для исключения слов, без ошибок синтаксиса
+    return SearchQuery(value, config=TEXT_SEARCH_CONFIG, search_type='websearch')
+
+
+def name_query(value):
+    words = WORD_RE.findall(value.lower())
+    if not words:
+        return None
+    return SearchQuery(" & ".join(f"{word}:*" for word in words), config=NAME_SEARCH_CONFIG, search_type='raw')
+
+
+def full_text_search(queryset, vector, query, rank=True):
+    """Фильтр по tsvector @@ tsquery, по убыванию релевантности."""
+    if query is None:
+        return queryset.none()
+    queryset = queryset.annotate(search_vector=vector).filter(search_vector=query)
+    if not rank:
+        return queryset
+    return queryset.annotate(rank=SearchRank(vector, query)).order_by('-rank', 'pk')
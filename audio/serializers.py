@@ -1,3 +1,4 @@
+from django.db.models import OuterRef, Prefetch, Subquery
 from rest_framework import serializers
 
 from .models import (
@@ -12,10 +13,72 @@ from .models import (
     Student,
     Question,
     Protocol,
+    TranscriptSegment,
     CommissionComposition,
     SecretarySpecialization,
 )
 
+
+def parse_field_paths(value):
+    """"ID,ID_Student.Surname" -> {'ID': {}, 'ID_Student': {'Surname': {}}}"""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in path.strip().split('.'):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+def select_fields(fields, only, expand):
+    """
+    only — какие поля оставить (None — все), expand — какие вложенные объекты
+    раскрывать (None — все, как без параметра). Не раскрытые вложенные
+    сериализаторы заменяются на первичные ключи.
+    """
+    if only:
+        for name in list(fields):
+            if name not in only:
+                fields.pop(name)
+
+    for name, field in list(fields.items()):
+        if not isinstance(field, serializers.BaseSerializer):
+            continue
+        nested_only = (only or {}).get(name) or None
+        if expand is not None and name not in expand and not nested_only:
+            fields[name] = serializers.PrimaryKeyRelatedField(
+                read_only=True,
+                source=field.source if field.source != name else None,
+                many=isinstance(field, serializers.ListSerializer),
+            )
+            continue
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        select_fields(nested.fields, nested_only, None if expand is None else expand.get(name, {}))
+    return fields
+
+
+class FieldSelectionMixin:
+    """
+    ?fields=ID,Grade,ID_Student.Surname — только перечисленные поля;
+    ?expand=ID_Student,ID_DefenseSchedule.ID_Commission — раскрыть только эти
+    вложенные объекты, остальные отдаются id. Без параметров ответ не меняется.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        # Вложенные сериализаторы настраивает корневой (для списка — его child)
+        root = self.root.child if isinstance(self.root, serializers.ListSerializer) else self.root
+        if request is None or root is not self or request.method != 'GET':
+            return fields
+
+        only = parse_field_paths(request.query_params['fields']) if 'fields' in request.query_params else None
+        expand = parse_field_paths(request.query_params['expand']) if 'expand' in request.query_params else None
+        if only is None and expand is None:
+            return fields
+        return select_fields(fields, only, expand)
+
+
 class AudioUploadSerializer(serializers.ModelSerializer):
     project_id = serializers.IntegerField(write_only=True)
 
@@ -26,13 +89,33 @@ class AudioUploadSerializer(serializers.ModelSerializer):
             'audio': {'required': True}
         }
 
+    def validate(self, attrs):
+        # Хэш считается при загрузке (audio.uploadhandlers), иначе — здесь
+        audio = attrs['audio']
+        content_hash = getattr(audio, 'content_hash', None)
+        if not content_hash:
+            from audio.services.transcript_cache_service import TranscriptCacheService
+            content_hash = TranscriptCacheService.hash_file(audio)
+        attrs['content_hash'] = content_hash
+        return attrs
+
     def create(self, validated_data):
         project_id = validated_data.pop('project_id')
         audio_file = AudioFile.objects.create(**validated_data)
         self.context['project_id'] = project_id
         return audio_file
 
-class CommissionMemberSerializer(serializers.ModelSerializer):
+class UploadSessionSerializer(serializers.Serializer):
+    project_id = serializers.IntegerField()
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+
+    def validate_project_id(self, value):
+        if not Project.objects.filter(ID=value).exists():
+            raise serializers.ValidationError("Проект не найден")
+        return value
+
+class CommissionMemberSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     class Meta:
         model = CommissionMember
         fields = '__all__'
@@ -43,20 +126,20 @@ class CommissionCompositionSerializer(serializers.ModelSerializer):
         model = CommissionComposition
         fields = '__all__'
 
-class Commission_CompositionSerializer(serializers.ModelSerializer):
+class Commission_CompositionSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     ID_Member = CommissionMemberSerializer()
     class Meta:
         model = CommissionComposition
         fields = '__all__'
 
-class CommissionSerializer(serializers.ModelSerializer):
+class CommissionSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     members = CommissionCompositionSerializer(many=True, read_only=True, source='commissioncomposition_set')
     class Meta:
         model = Commission
         fields = '__all__'
 
 
-class DefenseScheduleSerializer(serializers.ModelSerializer):
+class DefenseScheduleSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     ID_Commission =  CommissionSerializer(read_only=True)
     class Meta:
         model = DefenseSchedule
@@ -72,7 +155,7 @@ class InstituteSerializer(serializers.ModelSerializer):
         model = Institute
         fields = '__all__'
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     class Meta:
         model = Project
         fields = '__all__'
@@ -83,7 +166,7 @@ class SpecializationSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     ID_Group = GroupSerializer(read_only=True)
     grade = serializers.SerializerMethodField()
     ID_Specialization = SpecializationSerializer(read_only=True)
@@ -92,16 +175,47 @@ class StudentSerializer(serializers.ModelSerializer):
         model = Student
         fields = '__all__'
 
+    def plan_queryset(self, queryset, prefix):
+        # Для списка студентов последняя оценка — подзапрос в том же SELECT.
+        # Вложенным студентам (protocols) аннотацию не передать через JOIN,
+        # поэтому их протоколы подгружаются одним запросом, новые первыми
+        if 'grade' not in self.fields:
+            return queryset
+        if not prefix:
+            return queryset.annotate(latest_grade=Subquery(
+                Protocol.objects.filter(ID_Student=OuterRef('pk')).order_by('-ID').values('Grade')[:1]
+            ))
+        return queryset.prefetch_related(Prefetch(
+            f"{prefix}protocol_set",
+            queryset=Protocol.objects.order_by('-ID').only('ID', 'Grade', 'ID_Student'),
+            to_attr='protocols_latest_first',
+        ))
+
     def get_grade(self, obj):
+        # latest_grade или protocols_latest_first добавляет plan_queryset;
+        # без них — отдельный запрос
+        if hasattr(obj, 'latest_grade'):
+            return obj.latest_grade
+        if hasattr(obj, 'protocols_latest_first'):
+            return obj.protocols_latest_first[0].Grade if obj.protocols_latest_first else None
         last_protocol = obj.protocol_set.order_by('-ID').first()
         return last_protocol.Grade if last_protocol else None
 
-class QuestionSerializer(serializers.ModelSerializer):
+class TranscriptSegmentSerializer(FieldSelectionMixin, serializers.ModelSerializer):
+    class Meta:
+        model = TranscriptSegment
+        fields = '__all__'
+
+class QuestionSerializer(FieldSelectionMixin, serializers.ModelSerializer):
+    # Время в записи, с которого звучит вопрос (для перехода к нужному месту)
+    Start = serializers.FloatField(source='ID_Segment.Start', read_only=True, default=None)
+    End = serializers.FloatField(source='ID_Segment.End', read_only=True, default=None)
+
     class Meta:
         model = Question
         fields = '__all__'
 
-class ProtocolSerializer(serializers.ModelSerializer):
+class ProtocolSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     ID_Student = StudentSerializer()
     ID_DefenseSchedule = DefenseScheduleSerializer()
     class Meta:
@@ -109,7 +223,7 @@ class ProtocolSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class SecretarySpecializationSerializer(serializers.ModelSerializer):
+class SecretarySpecializationSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     ID_Specialization = SpecializationSerializer(read_only=True)
     class Meta:
         model = SecretarySpecialization
@@ -122,6 +236,12 @@ class UpdateGradeSerializer(serializers.ModelSerializer):
         fields = ['ID_Student', 'Grade']
 
 
+class BulkGradeSerializer(serializers.Serializer):
+    # Студенты проверяются одним запросом в GradeService, а не по строке
+    ID_Student = serializers.IntegerField(min_value=1)
+    Grade = serializers.CharField(max_length=30)
+
+
 class UpdateDefenseTimeByProjectSerializer(serializers.ModelSerializer):
     ID_Project = serializers.IntegerField(write_only=True)
 
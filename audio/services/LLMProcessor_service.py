@@ -1,59 +1,326 @@
 # services/llm_processor.py
 import os
-from llama_cpp import Llama
+import re
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from audio.services.llm_cache_service import LLMResultCache
+from audio.services.question_dedup_service import QuestionDeduplicationService
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_RE = re.compile(r'(?<=[.!?…])\s+')
+NUMBERED_LINE_RE = re.compile(r'^\s*\d+\s*[.)]\s*(.+?)\s*$')
+THINK_OPEN = '<think>'
+THINK_CLOSE = '</think>'
+
+MAP_PROMPT = """Проанализируй текст и выдели основные смысловые вопросы. Требования:
+1. Нумерованный список
+2. Сохрани технические термины
+3. Объедини повторяющиеся вопросы
+4. Только вопросы
+
+Текст: {text}"""
+
+class AnswerLines:
+    """
+    Строки ответа модели без рассуждения. DeepSeek-R1 сначала рассуждает внутри
+    <think>…</think> (открывающий тег может отсутствовать), и нумерованные строки
+    рассуждения — не вопросы. Текст подается кусками по мере генерации; строки
+    отдаются только после </think>. Если ответ начался не с <think>, строки
+    копятся до </think> или до конца ответа: без тега рассуждения весь текст — ответ.
+    """
+
+    START, THINK, PENDING, ANSWER = 'start', 'think', 'pending', 'answer'
+
+    def __init__(self):
+        self.state = self.START
+        self.buffer = ''
+
+    def feed(self, text):
+        self.buffer += text
+        if self.state != self.ANSWER:
+            end = self.buffer.find(THINK_CLOSE)
+            if end != -1:
+                self.buffer = self.buffer[end + len(THINK_CLOSE):]
+                self.state = self.ANSWER
+            elif self.state == self.START:
+                head = self.buffer.lstrip()
+                if head.startswith(THINK_OPEN):
+                    self.state = self.THINK
+                elif head and not THINK_OPEN.startswith(head):
+                    self.state = self.PENDING
+
+        if self.state == self.THINK:
+            # Рассуждение не нужно: храним только хвост, где может начинаться </think>
+            self.buffer = self.buffer[-len(THINK_CLOSE):]
+            return []
+        if self.state != self.ANSWER:
+            return []
+        *lines, self.buffer = self.buffer.split('\n')
+        return lines
+
+    def finish(self):
+        # Незакрытое рассуждение (модель не успела ответить) вопросов не дает
+        if self.state == self.THINK:
+            return []
+        lines = self.buffer.split('\n')
+        self.buffer = ''
+        return lines
 
 
 class LLMProcessor:
+    # Модель живет только в воркере очереди llm (см. QuestionGenerationService),
+    # Django и остальные воркеры ее не загружают
     _instance = None
+    _instance_lock = threading.Lock()
 
     def __init__(self):
+        self.config = self.get_config()
+        # Несколько контекстов Llama поверх одного файла: веса отображаются через mmap
+        # и делятся между ними, отдельными остаются только KV-кэши. Сама Llama
+        # не потокобезопасна, поэтому контекст выдается одному потоку за раз
+        self._contexts = queue.Queue()
         self.model = None
+        self.last_stats = {}
         self.load_model()
 
     @classmethod
     def get_instance(cls):
         if cls._instance is None:
-            cls._instance = cls()
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
         return cls._instance
 
+    @staticmethod
+    def get_config():
+        return {
+            'model_path': str(getattr(settings, 'LLM_MODEL_PATH')),
+            'n_ctx': getattr(settings, 'LLM_CONTEXT', 4096),
+            'n_threads': getattr(settings, 'LLM_THREADS', None) or os.cpu_count(),
+            'n_batch': getattr(settings, 'LLM_BATCH', 512),
+            'n_gpu_layers': getattr(settings, 'LLM_GPU_LAYERS', 0),
+            'parallel': getattr(settings, 'LLM_PARALLEL_CONTEXTS', 1),
+            'max_tokens': getattr(settings, 'LLM_MAX_TOKENS', 500),
+            'max_questions': getattr(settings, 'LLM_MAX_QUESTIONS', 20),
+        }
+
     def load_model(self):
-        model_path = r"C:\Models\DeepSeek-R1-Distill-Qwen-7B-Q4_K_M.gguf"
+        from llama_cpp import Llama
 
+        model_path = self.config['model_path']
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Model file not found: {model_path}")
 
-        self.model = Llama(
-            model_path=model_path,
-            n_ctx=4096,
-            n_threads=6,
-            n_batch=128,
-            n_gpu_layers=20,
-            verbose=False
+        parallel = max(1, self.config['parallel'])
+        for _ in range(parallel):
+            context = Llama(
+                model_path=model_path,
+                n_ctx=self.config['n_ctx'],
+                n_threads=max(1, self.config['n_threads'] // parallel),
+                n_batch=self.config['n_batch'],
+                n_gpu_layers=self.config['n_gpu_layers'],
+                use_mmap=True,
+                verbose=False
+            )
+            self._contexts.put(context)
+        # Для токенизации подходит любой контекст
+        self.model = context
+        logger.info(f"LLM loaded from {model_path} with {parallel} contexts")
+
+    @contextmanager
+    def acquire(self):
+        context = self._contexts.get()
+        try:
+            yield context
+        finally:
+            self._contexts.put(context)
+
+    def count_tokens(self, text):
+        return len(self.model.tokenize(text.encode('utf-8'), add_bos=False))
+
+    def split_windows(self, text):
+        # Окно — столько предложений, сколько влезает в контекст вместе с промптом и ответом
+        budget = (
+            self.config['n_ctx']
+            - self.count_tokens(MAP_PROMPT.format(text=''))
+            - self.config['max_tokens']
+            - 16
         )
+        windows, current, current_tokens = [], [], 0
+        for sentence in SENTENCE_RE.split(text.strip()):
+            tokens = self.count_tokens(sentence) + 1
+            if tokens > budget:
+                # Слишком длинное "предложение" (расшифровка без точек) режем по словам
+                words = sentence.split()
+                step = max(1, len(words) * budget // tokens)
+                pieces = [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+            else:
+                pieces = [sentence]
+            for piece in pieces:
+                piece_tokens = tokens if len(pieces) == 1 else self.count_tokens(piece) + 1
+                if current and current_tokens + piece_tokens > budget:
+                    windows.append(" ".join(current))
+                    current, current_tokens = [], 0
+                current.append(piece)
+                current_tokens += piece_tokens
+        if current:
+            windows.append(" ".join(current))
+        return windows
 
-    def generate_questions(self, text):
-        prompt = f"""Проанализируй текст и выдели основные смысловые вопросы. Требования:
-1. Нумерованный список
-2. Сохрани технические термины
-3. Объедини повторяющиеся вопросы
-4. Только вопросы
+    def sampling_params(self):
+        return {
+            'max_tokens': self.config['max_tokens'],
+            'temperature': 0.6,
+            'top_p': 0.95,
+            'top_k': 40,
+        }
+
+    def cache_key(self, text, mode, **params):
+        return LLMResultCache.make_key(
+            text,
+            self.config['model_path'],
+            {'mode': mode, 'n_ctx': self.config['n_ctx'], **self.sampling_params(), **params},
+        )
+
+    def stream_questions(self, text, max_questions=None):
+        """
+        Отдает вопросы по мере генерации: каждый — как только модель дописала
+        его нумерованную строку. Окна расшифровки обрабатываются параллельно;
+        вопрос, повторяющий или перефразирующий уже отданный (в том числе из
+        другого окна), отбрасывается — отдельного шага сведения нет. Генерация
+        останавливается, когда набрано max_questions вопросов или вызывающий
+        код закрыл генератор.
+        """
+        key = self.cache_key(
+            text, 'stream', max_questions=max_questions, dedup=QuestionDeduplicationService.get_config(),
+        )
+        cached = LLMResultCache.get(key)
+        if cached is not None:
+            yield from cached
+            return
+
+        questions = []
+        for question in self._stream_questions(text, max_questions):
+            questions.append(question)
+            yield question
+        # Сюда доходим, только если генерация завершилась без ошибок и не была прервана
+        LLMResultCache.set(key, questions)
 
-Текст: {text[:3000]}"""  # Обрезка текста до 3000 символов
+    def _stream_questions(self, text, max_questions=None):
+        started = time.perf_counter()
+        windows = self.split_windows(text)
+        usage = {'prompt_tokens': 0, 'completion_tokens': 0}
+        results = queue.Queue()
+        stop = threading.Event()
+        done = object()
+        errors = []
 
+        def produce(window):
+            try:
+                if stop.is_set():
+                    return
+                prompt = MAP_PROMPT.format(text=window)
+                usage['prompt_tokens'] += self.count_tokens(prompt)
+                with self.acquire() as context:
+                    answer = AnswerLines()
+                    stream = context(prompt, stream=True, **self.sampling_params())
+                    try:
+                        for chunk in stream:
+                            if stop.is_set():
+                                break
+                            # В потоке llama.cpp каждый кусок — один токен
+                            usage['completion_tokens'] += 1
+                            for line in answer.feed(chunk['choices'][0]['text']):
+                                question = self.parse_line(line)
+                                if question:
+                                    results.put(question)
+                    finally:
+                        # Закрытие потока токенов останавливает генерацию и освобождает контекст
+                        stream.close()
+                    for line in answer.finish():
+                        question = self.parse_line(line)
+                        if question and not stop.is_set():
+                            results.put(question)
+            except Exception as e:
+                logger.error(f"LLM streaming error: {str(e)}")
+                errors.append(e)
+            finally:
+                results.put(done)
+
+        executor = ThreadPoolExecutor(max_workers=max(1, self.config['parallel']))
         try:
-            response = self.model(
-                prompt,
-                max_tokens=500,
-                temperature=0.6,
-                top_p=0.95,
-                top_k=40,
-                stop=["\n"]
-            )
-            return self.clean_output(response['choices'][0]['text'])
-        except Exception as e:
-            # Логирование ошибки и возврат пустого списка
-            return []
+            for window in windows:
+                executor.submit(produce, window)
+
+            seen = set()
+            questions = []
+            finished = 0
+            while finished < len(windows):
+                question = results.get()
+                if question is done:
+                    finished += 1
+                    continue
+                key = self.normalize(question)
+                if not key or key in seen:
+                    continue
+                seen.add(key)
+                if self.is_repeated(question, questions):
+                    continue
+                questions.append(question)
+                yield question
+                if max_questions and len(questions) >= max_questions:
+                    return
+            if errors:
+                raise RuntimeError(f"LLM streaming failed: {errors[0]}")
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.last_stats = self.build_stats(text, windows, usage, started)
+            logger.info(f"LLM questions: {self.last_stats}")
+
+    @staticmethod
+    def is_repeated(question, questions):
+        # Окна генерируются независимо, и один вопрос защиты часто приходит из
+        # нескольких окон в разных формулировках
+        if not questions or not QuestionDeduplicationService.is_enabled():
+            return False
+        return QuestionDeduplicationService.is_duplicate(question, questions)
 
     @staticmethod
-    def clean_output(text):
-        return [q.split('. ', 1)[-1] for q in text.split('\n') if q.strip()]
\ No newline at end of file
+    def build_stats(text, windows, usage, started):
+        elapsed = time.perf_counter() - started
+        return {
+            'chars': len(text),
+            'windows': len(windows),
+            'prompt_tokens': usage['prompt_tokens'],
+            'completion_tokens': usage['completion_tokens'],
+            'latency_sec': round(elapsed, 2),
+            'tokens_per_sec': round(
+                (usage['prompt_tokens'] + usage['completion_tokens']) / elapsed, 1
+            ) if elapsed else None,
+        }
+
+    @staticmethod
+    def normalize(question):
+        return re.sub(r'[^\w\s]', '', question.lower()).strip()
+
+    @staticmethod
+    def parse_line(line):
+        # Вопросом считается только пункт нумерованного списка; прочий текст
+        # вокруг списка отбрасывается (рассуждение отсекает AnswerLines)
+        match = NUMBERED_LINE_RE.match(line)
+        return match.group(1) if match else None
+
+    @classmethod
+    def clean_output(cls, text):
+        answer = AnswerLines()
+        lines = answer.feed(text) + answer.finish()
+        return [question for question in map(cls.parse_line, lines) if question]
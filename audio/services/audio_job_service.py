@@ -0,0 +1,186 @@
+import logging
+from datetime import timedelta
+
+from celery import states
+from celery.utils import uuid
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from audio.models import AudioJob
+from audio.services.progress_service import JobProgressService
+from audio.services.transcript_cache_service import TranscriptCacheService
+
+logger = logging.getLogger(__name__)
+
+
+class AudioJobService:
+    """
+    Обработки записей по проектам (по content_hash записи):
+    - запись, уже обработанная для проекта, не сохраняется в него второй раз;
+    - запись, которая сейчас распознается для другого проекта, не распознается
+      повторно: новая обработка ждет результат (WAITING) и получает его из кэша;
+    - запись из кэша расшифровок сохраняется в проект без распознавания.
+    Распознавание подтверждается при получении задачи, поэтому после гибели воркера
+    обработка остается RUNNING: без отметок этапов дольше AUDIO_JOB_TIMEOUT она
+    считается брошенной.
+    """
+
+    ACTIVE = [AudioJob.Status.RUNNING, AudioJob.Status.WAITING, AudioJob.Status.DONE]
+
+    @staticmethod
+    def get_timeout():
+        return getattr(settings, 'AUDIO_JOB_TIMEOUT', 2 * 60 * 60)
+
+    @classmethod
+    def heartbeat(cls, job_id):
+        """Отметка этапа идущей обработки: продлевает ее до AUDIO_JOB_TIMEOUT."""
+        AudioJob.objects.filter(job_id=job_id, status=AudioJob.Status.RUNNING).update(updated_at=timezone.now())
+
+    @classmethod
+    def expire_stale(cls, content_hash):
+        """Брошенные обработки записи отмечаются неудачными вместе с ожидающими их."""
+        deadline = timezone.now() - timedelta(seconds=cls.get_timeout())
+        stale = AudioJob.objects.filter(
+            content_hash=content_hash, status=AudioJob.Status.RUNNING, updated_at__lt=deadline
+        )
+        for job_id in list(stale.values_list('job_id', flat=True)):
+            # Условное обновление: отметка этапа между выборкой и записью сохраняет обработку
+            expired = AudioJob.objects.filter(
+                job_id=job_id, status=AudioJob.Status.RUNNING, updated_at__lt=deadline
+            ).update(status=AudioJob.Status.FAILED)
+            if not expired:
+                continue
+            logger.warning(f"Job {job_id} has no progress for {cls.get_timeout()}s, marking it failed")
+            exc = TimeoutError(f"Job {job_id} has no progress for {cls.get_timeout()}s")
+            JobProgressService.report_failure(job_id, exc)
+            cls.fail_waiting(content_hash, exc)
+
+    @classmethod
+    def find(cls, project_id, content_hash):
+        if not content_hash:
+            return None
+        cls.expire_stale(content_hash)
+        return AudioJob.objects.filter(
+            project_id=project_id, content_hash=content_hash, status__in=cls.ACTIVE
+        ).first()
+
+    @classmethod
+    def create(cls, job_id, project_id, content_hash, status=AudioJob.Status.RUNNING, questions=0):
+        """(обработка, создана ли). Если запись уже обрабатывается для проекта — существующая."""
+        try:
+            with transaction.atomic():
+                job = AudioJob.objects.create(
+                    job_id=job_id, project_id=project_id, content_hash=content_hash or '',
+                    status=status, questions=questions,
+                )
+            return job, True
+        except IntegrityError:
+            return cls.find(project_id, content_hash), False
+
+    @classmethod
+    def reuse(cls, project_id, content_hash):
+        """
+        Готовый или ожидаемый результат без нового распознавания:
+        (обработка, 'existing' | 'waiting' | 'cached') или (None, None).
+        """
+        if not content_hash:
+            return None, None
+        existing = cls.find(project_id, content_hash)
+        if existing is not None:
+            return existing, 'existing'
+
+        with transaction.atomic():
+            # Блокировка идущей обработки: она не завершится, пока ожидающая не записана
+            leader = AudioJob.objects.select_for_update().filter(
+                content_hash=content_hash, status=AudioJob.Status.RUNNING
+            ).first()
+            if leader is not None:
+                job, created = cls.create(uuid(), project_id, content_hash, AudioJob.Status.WAITING)
+                if created:
+                    JobProgressService.report(job.job_id, 'queued', state=states.PENDING, project_id=project_id)
+                    logger.info(f"Job {job.job_id} waits for {leader.job_id} ({content_hash[:12]})")
+                return job, 'waiting' if created else 'existing'
+
+        # Обработка сохраняет кэш раньше, чем отмечается завершенной
+        cached = TranscriptCacheService.get(content_hash)
+        if cached is None:
+            return None, None
+        with transaction.atomic():
+            job, created = cls.create(
+                uuid(), project_id, content_hash, AudioJob.Status.DONE, questions=len(cached.questions)
+            )
+            if created:
+                TranscriptCacheService.apply(cached, project_id)
+        if created:
+            cls.report_done(job, cached=True)
+        return job, 'cached' if created else 'existing'
+
+    @classmethod
+    def mark_done(cls, job_id, questions):
+        """
+        Отмечает обработку выполненной; вызывается в транзакции записи вопросов.
+        True — отмечена сейчас, False — уже была отмечена (повтор задачи),
+        None — обработка запущена без AudioJob.
+        """
+        job = AudioJob.objects.select_for_update().filter(job_id=job_id).first()
+        if job is None:
+            return None
+        if job.status == AudioJob.Status.DONE:
+            return False
+        if job.status == AudioJob.Status.FAILED and cls.find(job.project_id, job.content_hash) is not None:
+            # Обработку сочли брошенной, и запись уже обрабатывается для проекта заново
+            return False
+        job.status = AudioJob.Status.DONE
+        job.questions = questions
+        job.save(update_fields=['status', 'questions', 'updated_at'])
+        return True
+
+    @classmethod
+    def release_waiting(cls, content_hash):
+        cached = TranscriptCacheService.get(content_hash)
+        waiting = AudioJob.objects.filter(content_hash=content_hash, status=AudioJob.Status.WAITING)
+        for job_id in waiting.values_list('job_id', flat=True):
+            with transaction.atomic():
+                job = AudioJob.objects.select_for_update().filter(
+                    job_id=job_id, status=AudioJob.Status.WAITING
+                ).first()
+                if job is None:
+                    continue
+                if cached is None:
+                    job.status = AudioJob.Status.FAILED
+                else:
+                    TranscriptCacheService.apply(cached, job.project_id)
+                    job.status = AudioJob.Status.DONE
+                    job.questions = len(cached.questions)
+                job.save(update_fields=['status', 'questions', 'updated_at'])
+            if cached is None:
+                JobProgressService.report_failure(job.job_id, RuntimeError("Transcript cache entry is missing"))
+            else:
+                cls.report_done(job, cached=True)
+
+    @classmethod
+    def fail(cls, job_id, exc):
+        job = AudioJob.objects.filter(job_id=job_id).first()
+        if job is None:
+            return
+        AudioJob.objects.filter(job_id=job_id).update(status=AudioJob.Status.FAILED)
+        if job.content_hash:
+            cls.fail_waiting(job.content_hash, exc)
+
+    @classmethod
+    def fail_waiting(cls, content_hash, exc):
+        # Ожидающие продолжают ждать, если ту же запись распознает еще одна обработка
+        if AudioJob.objects.filter(content_hash=content_hash, status=AudioJob.Status.RUNNING).exists():
+            return
+        waiting = AudioJob.objects.filter(content_hash=content_hash, status=AudioJob.Status.WAITING)
+        for waiting_job_id in list(waiting.values_list('job_id', flat=True)):
+            AudioJob.objects.filter(job_id=waiting_job_id).update(status=AudioJob.Status.FAILED)
+            JobProgressService.report_failure(waiting_job_id, exc)
+
+    @staticmethod
+    def report_done(job, **meta):
+        JobProgressService.report(
+            job.job_id, 'saved', state=states.SUCCESS,
+            project_id=job.project_id, questions=job.questions, **meta,
+        )
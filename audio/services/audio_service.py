@@ -1,13 +1,72 @@
 import os
-from pydub import AudioSegment
+import queue
+import shutil
+import subprocess
+import threading
+
+import billiard
+import numpy as np
+from django.conf import settings
 from django.core.files.storage import default_storage
-import whisper
 import logging
+
+from audio.services.model_registry import WhisperModelRegistry
+from audio.services.vad_service import VADService
+
 logger = logging.getLogger(__name__)
 
+SAMPLE_RATE = 16000  # whisper.audio.SAMPLE_RATE; не импортируем whisper ради константы
+FRAME_SECONDS = 0.03
+DECODE_BLOCK_SIZE = 1024 * 1024
+
+# Параметры модели в дочерних процессах пула (задаются в initializer)
+_chunk_worker_config = {}
+
+
+def _init_chunk_worker(name, device, threads):
+    _chunk_worker_config.update(name=name, device=device, threads=threads)
+    WhisperModelRegistry.get_model(name, device, threads=threads)
+
+
+def compact_segment(segment):
+    # Только то, что нужно дальше: время, текст, уверенность и слова
+    return {
+        'start': segment['start'],
+        'end': segment['end'],
+        'text': segment['text'],
+        'avg_logprob': segment.get('avg_logprob'),
+        'no_speech_prob': segment.get('no_speech_prob'),
+        'words': [
+            {
+                'word': word['word'],
+                'start': word['start'],
+                'end': word['end'],
+                'probability': word.get('probability'),
+            }
+            for word in segment.get('words') or []
+        ],
+    }
+
+
+def word_timestamps_enabled():
+    return getattr(settings, 'WHISPER_WORD_TIMESTAMPS', True)
+
+
+def _transcribe_chunk(audio, language):
+    model = WhisperModelRegistry.get_model(
+        _chunk_worker_config.get('name'),
+        _chunk_worker_config.get('device'),
+        threads=_chunk_worker_config.get('threads'),
+    )
+    result = model.transcribe(audio, language=language, word_timestamps=word_timestamps_enabled())
+    return [compact_segment(segment) for segment in result['segments']]
+
+
 class AudioService:
     ALLOWED_EXTENSIONS = ['.wav', '.mp3', '.ogg', '.flac', '.3gp', '.m4a']
 
+    _pool = None
+
     @classmethod
     def validate_audio_file(cls, file_name):
         if not file_name:
@@ -17,21 +76,258 @@ class AudioService:
             raise ValueError(f"Unsupported file format. Allowed: {', '.join(cls.ALLOWED_EXTENSIONS)}")
 
     @classmethod
-    def convert_to_wav(cls, input_path, output_path):
+    def decode_audio(cls, source):
+        """
+        Декодирует запись через ffmpeg сразу в 16 кГц моно float32 без
+        промежуточного WAV. source — путь к файлу или файловый объект
+        (он подается в ffmpeg через stdin блоками).
+        """
+        from_path = isinstance(source, (str, os.PathLike))
+        cmd = [
+            shutil.which('ffmpeg') or 'ffmpeg',
+            '-loglevel', 'error',
+            '-threads', '0',
+            '-i', os.fspath(source) if from_path else 'pipe:0',
+            '-f', 's16le',
+            '-ac', '1',
+            '-acodec', 'pcm_s16le',
+            '-ar', str(SAMPLE_RATE),
+            'pipe:1',
+        ]
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL if from_path else subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
+        feeder = None
+        if not from_path:
+            feeder = threading.Thread(target=cls._feed_ffmpeg, args=(source, process.stdin), daemon=True)
+            feeder.start()
+
+        # Копим 16-битный PCM (2 байта на отсчет) и один раз переводим во float32,
+        # без промежуточных копий, которые делает whisper.load_audio
+        pcm = bytearray()
+        while True:
+            block = process.stdout.read(DECODE_BLOCK_SIZE)
+            if not block:
+                break
+            pcm += block
+
+        stderr = process.stderr.read()
+        process.wait()
+        if feeder is not None:
+            feeder.join()
+        if process.returncode != 0:
+            message = stderr.decode(errors='ignore').strip()
+            logger.error(f"Audio decode error: {message}")
+            raise RuntimeError(f"Failed to decode audio: {message}")
+
+        samples = np.frombuffer(pcm, dtype=np.int16, count=len(pcm) // 2)
+        audio = np.empty(len(samples), dtype=np.float32)
+        np.divide(samples, 32768.0, out=audio, casting='unsafe')
+        return audio
+
+    @staticmethod
+    def _feed_ffmpeg(source, stdin):
         try:
-            audio = AudioSegment.from_file(input_path)
-            audio.export(output_path, format='wav')
-            return output_path
-        except Exception as e:
-            logger.error(f"Audio conversion error: {str(e)}")
-            raise
+            for block in iter(lambda: source.read(DECODE_BLOCK_SIZE), b''):
+                stdin.write(block)
+        except BrokenPipeError:
+            # ffmpeg завершился раньше — ошибку покажет код возврата
+            pass
+        finally:
+            try:
+                stdin.close()
+            except BrokenPipeError:
+                pass
 
     @classmethod
     def transcribe_audio(cls, file_path, language='ru'):
+        return cls.transcribe(cls.decode_audio(file_path), language=language)['text']
+
+    @classmethod
+    def transcribe(cls, audio, language='ru', progress=None, checkpoint=None):
+        # progress(done, total) вызывается по мере распознавания кусков записи,
+        # checkpoint (PipelineCheckpoint) сохраняет готовые куски для повторного запуска
         try:
-            model = whisper.load_model("small")
-            result = model.transcribe(file_path, language=language)
-            return result['text']
+            regions = vad_stats = None
+            if VADService.is_enabled():
+                audio, regions, vad_stats = VADService.apply(audio)
+                if not len(audio):
+                    return {'text': '', 'segments': [], 'language': language, 'vad': vad_stats}
+
+            if cls.should_chunk(audio):
+                result = cls.transcribe_chunked(audio, language=language, progress=progress, checkpoint=checkpoint)
+            else:
+                model = WhisperModelRegistry.get_model()
+                result = model.transcribe(audio, language=language, word_timestamps=word_timestamps_enabled())
+                result['segments'] = [compact_segment(segment) for segment in result['segments']]
+                result['text'] = " ".join(segment['text'].strip() for segment in result['segments'])
+                if progress:
+                    progress(1, 1)
+
+            if regions is not None:
+                VADService.restore_timestamps(result['segments'], regions)
+                result['vad'] = vad_stats
+            return result
         except Exception as e:
             logger.error(f"Transcription error: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    @classmethod
+    def should_chunk(cls, audio):
+        if not getattr(settings, 'WHISPER_CHUNKED', False):
+            return False
+        min_duration = getattr(settings, 'WHISPER_CHUNK_MIN_DURATION', 300)
+        return len(audio) / SAMPLE_RATE > min_duration
+
+    @classmethod
+    def split_on_silence(cls, audio, chunk_seconds=None, overlap_seconds=None, search_seconds=None):
+        """
+        Делит запись на куски около chunk_seconds, разрезая в самом тихом месте
+        рядом с границей. Каждый кусок расширяется на overlap_seconds в обе стороны,
+        а core_start/core_end задают его "собственную" часть для склейки.
+        """
+        chunk_seconds = chunk_seconds or getattr(settings, 'WHISPER_CHUNK_SECONDS', 120)
+        if overlap_seconds is None:
+            overlap_seconds = getattr(settings, 'WHISPER_CHUNK_OVERLAP', 2)
+        if search_seconds is None:
+            search_seconds = getattr(settings, 'WHISPER_CHUNK_SEARCH', 10)
+
+        total = len(audio)
+        chunk = int(chunk_seconds * SAMPLE_RATE)
+        overlap = int(overlap_seconds * SAMPLE_RATE)
+        search = int(search_seconds * SAMPLE_RATE)
+        frame = int(FRAME_SECONDS * SAMPLE_RATE)
+
+        # Среднеквадратичная энергия по кадрам 30 мс
+        n_frames = total // frame
+        energy = np.sqrt(np.mean(np.square(audio[:n_frames * frame].reshape(n_frames, frame)), axis=1))
+
+        cuts = [0]
+        while total - cuts[-1] > chunk + search:
+            target = cuts[-1] + chunk
+            lo = max(target - search, cuts[-1] + frame) // frame
+            hi = min(target + search, n_frames * frame) // frame
+            quietest = lo + int(np.argmin(energy[lo:hi]))
+            cuts.append(quietest * frame + frame // 2)
+        cuts.append(total)
+
+        return [
+            {
+                'start': max(0, core_start - overlap),
+                'end': min(total, core_end + overlap),
+                'core_start': core_start,
+                'core_end': core_end,
+            }
+            for core_start, core_end in zip(cuts[:-1], cuts[1:])
+        ]
+
+    @staticmethod
+    def get_pool_workers():
+        # Каждый процесс пула держит свою копию модели: не больше числа ядер
+        workers = getattr(settings, 'WHISPER_POOL_WORKERS', 2) or 1
+        return max(1, min(workers, os.cpu_count() or 1))
+
+    @classmethod
+    def get_pool(cls):
+        # Пул живет столько же, сколько процесс воркера: модели в дочерних
+        # процессах загружаются один раз, а не на каждую запись.
+        # Пул billiard, а не concurrent.futures: дочерний процесс prefork-воркера
+        # Celery помечен как daemon, и стандартный multiprocessing не дает ему
+        # запускать свои процессы
+        if cls._pool is None:
+            config = WhisperModelRegistry.get_config()
+            workers = cls.get_pool_workers()
+            threads = max(1, (config['threads'] or os.cpu_count() or 1) // workers)
+            cls._pool = billiard.get_context('spawn').Pool(
+                processes=workers,
+                initializer=_init_chunk_worker,
+                initargs=(config['name'], config['device'], threads),
+            )
+        return cls._pool
+
+    @classmethod
+    def shutdown_pool(cls):
+        if cls._pool is not None:
+            cls._pool.terminate()
+            cls._pool.join()
+            cls._pool = None
+
+    @classmethod
+    def transcribe_chunked(cls, audio, language='ru', progress=None, checkpoint=None):
+        chunks = cls.split_on_silence(audio)
+
+        # Куски, распознанные до сбоя, берем из контрольной точки
+        results = {}
+        if checkpoint is not None:
+            for index, chunk in enumerate(chunks):
+                saved = checkpoint.load_json(f"chunk_{index}")
+                if saved and (saved['start'], saved['end']) == (chunk['start'], chunk['end']):
+                    results[index] = saved['segments']
+
+        logger.info(
+            f"Transcribing {len(audio) / SAMPLE_RATE:.0f}s of audio in {len(chunks)} chunks "
+            f"({len(results)} restored from checkpoint)"
+        )
+
+        pool = cls.get_pool()
+        done = queue.Queue()
+        pending = [index for index in range(len(chunks)) if index not in results]
+        for index in pending:
+            chunk = chunks[index]
+            pool.apply_async(
+                _transcribe_chunk,
+                (audio[chunk['start']:chunk['end']], language),
+                callback=lambda segments, index=index: done.put((index, segments, None)),
+                error_callback=lambda error, index=index: done.put((index, None, error)),
+            )
+        if progress and results:
+            progress(len(results), len(chunks))
+
+        # Ошибка одного куска не отменяет остальные: их результат сохраняется
+        # в контрольную точку и пригодится при повторе
+        errors = []
+        for _ in pending:
+            index, segments, error = done.get()
+            if error is not None:
+                errors.append(error)
+                continue
+            results[index] = segments
+            if checkpoint is not None:
+                chunk = chunks[index]
+                checkpoint.save_json(
+                    f"chunk_{index}",
+                    {'start': chunk['start'], 'end': chunk['end'], 'segments': results[index]},
+                )
+            if progress:
+                progress(len(results), len(chunks))
+        if errors:
+            raise errors[0]
+
+        segments = []
+        for index, chunk in enumerate(chunks):
+            offset = chunk['start'] / SAMPLE_RATE
+            core_start = chunk['core_start'] / SAMPLE_RATE
+            core_end = chunk['core_end'] / SAMPLE_RATE
+            for segment in results[index]:
+                segment['start'] += offset
+                segment['end'] += offset
+                for word in segment.get('words') or []:
+                    word['start'] += offset
+                    word['end'] += offset
+                # Сегменты из зоны перекрытия оставляем только соседнему куску
+                middle = (segment['start'] + segment['end']) / 2
+                if core_start <= middle < core_end:
+                    segments.append(segment)
+
+        for index, segment in enumerate(segments):
+            segment['id'] = index
+
+        return {
+            'text': " ".join(segment['text'].strip() for segment in segments),
+            'segments': segments,
+            'language': language,
+        }
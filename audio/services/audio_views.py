@@ -3,12 +3,17 @@ from django.views.decorators.csrf import csrf_exempt
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
+from django_celery_results.models import TaskResult
+import json
 
-from audio.models import Project
-from audio.task import process_audio_task
+from audio.models import AudioJob, Project, UploadSession
+from audio.task import start_audio_processing
+from audio.services.audio_job_service import AudioJobService
+from audio.services.upload_session_service import UploadError, UploadSessionService
+from celery.utils import uuid
 import logging
 
-from audio.serializers import AudioUploadSerializer
+from audio.serializers import AudioUploadSerializer, UploadSessionSerializer
 
 
 
@@ -22,24 +27,162 @@ def upload_audio(request):
         serializer = AudioUploadSerializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
 
+        project_id = serializer.validated_data['project_id']
+        cached_response = get_cached_response(serializer.validated_data['content_hash'], project_id)
+        if cached_response is not None:
+            return cached_response
+
         audio_file = serializer.save()
-        project_id = serializer.context['project_id']
+        return start_processing_response(audio_file, serializer.context['project_id'])
 
-        project = Project.objects.get(ID=project_id)
-        project.Status = "Вопросы расшифровываются"
-        project.save()
+    except Exception as e:
+        logger.error(f"Upload error: {str(e)}")
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+def get_cached_response(content_hash, project_id):
+    # Повторная загрузка той же записи: уже сохраненный в проект результат,
+    # ожидание идущей обработки этой записи или готовые вопросы из кэша
+    job, _ = AudioJobService.reuse(project_id, content_hash)
+    if job is None:
+        return None
+    return audio_job_response(job)
 
-        # Запускаем асинхронную задачу
-        process_audio_task.apply_async(args=[audio_file.id, project_id])
 
+def audio_job_response(job):
+    if job.status == AudioJob.Status.DONE:
         return Response(
-            {"message": "Audio processing started", "task_id": process_audio_task.request.id},
-            status=status.HTTP_202_ACCEPTED
+            {"message": "Audio already processed", "task_id": job.job_id, "job_id": job.job_id, "cached": True},
+            status=status.HTTP_200_OK
         )
+    return Response(
+        {"message": "Audio is already being processed", "task_id": job.job_id, "job_id": job.job_id},
+        status=status.HTTP_202_ACCEPTED
+    )
+
+
+def start_processing_response(audio_file, project_id, **extra):
+    job, created = AudioJobService.create(uuid(), project_id, audio_file.content_hash)
+    if not created:
+        # Та же запись загружена в проект параллельно: ее уже обрабатывают
+        audio_file.audio.delete(save=False)
+        audio_file.delete()
+        return audio_job_response(job)
 
+    project = Project.objects.get(ID=project_id)
+    project.Status = "Вопросы расшифровываются"
+    project.save()
+
+    # Запускаем цепочку задач обработки
+    job_id = start_audio_processing(audio_file.id, project_id, job.job_id)
+
+    return Response(
+        {"message": "Audio processing started", "task_id": job_id, "job_id": job_id, **extra},
+        status=status.HTTP_202_ACCEPTED
+    )
+
+
+def upload_error_response(error):
+    return Response({"error": str(error), **error.extra}, status=error.status_code)
+
+
+def upload_session_state(session, **extra):
+    return {
+        "session_id": session.id,
+        "project_id": session.project_id,
+        "filename": session.filename,
+        "size": session.size,
+        "received": session.received,
+        "status": session.status,
+        **extra,
+    }
+
+
+@csrf_exempt
+@api_view(['POST'])
+def upload_session_start(request):
+    serializer = UploadSessionSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    try:
+        session = UploadSessionService.start(**serializer.validated_data)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except UploadError as e:
+        return upload_error_response(e)
+
+    return Response(
+        upload_session_state(session, chunk_max_bytes=UploadSessionService.get_max_chunk_size()),
+        status=status.HTTP_201_CREATED
+    )
+
+
+@csrf_exempt
+@api_view(['GET', 'PUT'])
+def upload_session_detail(request, session_id):
+    session = UploadSession.objects.filter(id=session_id).first()
+    if session is None:
+        return Response({"error": "Сессия загрузки не найдена"}, status=status.HTTP_404_NOT_FOUND)
+    if request.method == 'GET':
+        return Response(upload_session_state(session))
+
+    # Тело запроса читается потоком, без request.data и без буферизации в памяти
+    try:
+        session, throughput = UploadSessionService.write_chunk(
+            session, request.stream, request.headers.get('Content-Range')
+        )
+    except UploadError as e:
+        return upload_error_response(e)
+    return Response(upload_session_state(session, throughput_mb_s=throughput))
+
+
+@csrf_exempt
+@api_view(['POST'])
+def upload_session_finalize(request, session_id):
+    session = UploadSession.objects.filter(id=session_id).first()
+    if session is None:
+        return Response({"error": "Сессия загрузки не найдена"}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        audio_file, throughput = UploadSessionService.complete(session)
+        cached_response = get_cached_response(audio_file.content_hash, session.project_id)
+        if cached_response is not None:
+            audio_file.audio.delete(save=False)
+            audio_file.delete()
+            return cached_response
+        return start_processing_response(audio_file, session.project_id, throughput_mb_s=throughput)
+
+    except UploadError as e:
+        return upload_error_response(e)
     except Exception as e:
-        logger.error(f"Upload error: {str(e)}")
+        logger.error(f"Upload finalize error: {str(e)}")
         return Response(
             {"error": str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+
+@api_view(['GET'])
+def audio_job_status(request, job_id):
+    # Один запрос по индексу task_id, без загрузки проектов и вопросов
+    job = TaskResult.objects.filter(task_id=job_id).values('status', 'result', 'date_done').first()
+    if job is None:
+        return Response({"error": "Задача не найдена"}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        meta = json.loads(job['result']) if job['result'] else {}
+    except ValueError:
+        meta = {}
+    if not isinstance(meta, dict):
+        meta = {}
+
+    return Response({
+        "job_id": job_id,
+        "state": job['status'],
+        "stage": meta.get('stage'),
+        "progress": meta.get('progress', 0),
+        "meta": meta,
+        "updated_at": job['date_done'],
+    })
@@ -0,0 +1,58 @@
+import json
+import os
+import shutil
+
+import numpy as np
+from django.core.files.storage import default_storage
+
+
+class PipelineCheckpoint:
+    """
+    Результаты этапов обработки одной записи в MEDIA_ROOT/jobs/<job_id>/.
+    Повтор задачи или перезапуск воркера продолжает с последнего готового этапа.
+    Файлы пишутся атомарно (через временный файл), поэтому недописанный
+    результат никогда не считается готовым.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.directory = default_storage.path(f"jobs/{job_id}")
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def has(self, name):
+        return os.path.exists(self.path(name))
+
+    def save_json(self, name, data):
+        self._write(f"{name}.json", lambda f: f.write(json.dumps(data, ensure_ascii=False).encode('utf-8')))
+
+    def load_json(self, name, default=None):
+        try:
+            with open(self.path(f"{name}.json"), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+
+    def has_json(self, name):
+        return self.has(f"{name}.json")
+
+    def save_array(self, name, array):
+        self._write(f"{name}.npy", lambda f: np.save(f, array))
+
+    def load_array(self, name):
+        return np.load(self.path(f"{name}.npy"))
+
+    def has_array(self, name):
+        return self.has(f"{name}.npy")
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _write(self, name, writer):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            writer(f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,62 @@
+import logging
+
+from django.db import transaction
+
+from audio.models import Protocol
+from audio.services.table_version_service import TableVersionService
+
+logger = logging.getLogger(__name__)
+
+
+class GradeService:
+    """Оценки студентов: пишутся в последний протокол студента."""
+
+    @staticmethod
+    def latest_protocols(student_ids, for_update=False):
+        # DISTINCT ON (ID_Student): один запрос на всех студентов, последний протокол каждого
+        protocols = Protocol.objects.filter(ID_Student__in=student_ids)
+        if for_update:
+            # FOR UPDATE несовместим с DISTINCT: сначала блокируем протоколы студентов
+            list(protocols.select_for_update().values_list('ID', flat=True))
+        protocols = protocols.order_by('ID_Student', '-ID').distinct('ID_Student')
+        return {protocol.ID_Student_id: protocol for protocol in protocols}
+
+    @classmethod
+    def bulk_update(cls, rows):
+        """
+        rows — [{'ID_Student', 'Grade'}]. Либо применяются все строки одним
+        bulk_update, либо ни одна: (обновлено ли, результат по каждой строке).
+        """
+        with transaction.atomic():
+            protocols = cls.latest_protocols([row['ID_Student'] for row in rows], for_update=True)
+
+            results = []
+            seen = set()
+            for row in rows:
+                student_id = row['ID_Student']
+                result = {'ID_Student': student_id, 'Grade': row['Grade']}
+                if student_id in seen:
+                    result.update(status='error', error="Студент указан несколько раз")
+                elif student_id not in protocols:
+                    result.update(status='error', error="Протокол для этого студента не найден")
+                else:
+                    result.update(status='ok', Protocol=protocols[student_id].ID)
+                seen.add(student_id)
+                results.append(result)
+
+            if any(result['status'] == 'error' for result in results):
+                return False, results
+
+            changed = []
+            for row in rows:
+                protocol = protocols[row['ID_Student']]
+                protocol.Grade = row['Grade']
+                changed.append(protocol)
+            Protocol.objects.bulk_update(changed, ['Grade'])
+            # bulk_update не шлет post_save: версию таблицы для ETag и кэша меняем сами
+            TableVersionService.bump(Protocol)
+
+        logger.info(f"Grades updated for {len(changed)} students")
+        for result in results:
+            result['status'] = 'updated'
+        return True, results
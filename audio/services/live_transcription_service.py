@@ -0,0 +1,99 @@
+import json
+import re
+import threading
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Vosk не расставляет знаки препинания, поэтому вопрос узнаем по вопросительным словам
+QUESTION_WORDS = {
+    'как', 'какой', 'какая', 'какое', 'какие', 'каким', 'какую', 'каких',
+    'почему', 'зачем', 'что', 'чем', 'чего', 'кто', 'кого', 'кому',
+    'где', 'куда', 'откуда', 'когда', 'сколько', 'насколько', 'каков', 'какова',
+    'чей', 'чья', 'чье', 'чьи', 'можно', 'объясните', 'расскажите', 'поясните',
+}
+QUESTION_PARTICLES = {'ли', 'разве', 'неужели'}
+WORD_RE = re.compile(r'\w+')
+
+
+class LiveTranscriptionService:
+    _model = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_model(cls):
+        if cls._model is None:
+            with cls._lock:
+                if cls._model is None:
+                    from vosk import Model
+                    model_path = str(getattr(settings, 'VOSK_MODEL_PATH'))
+                    cls._model = Model(model_path)
+                    logger.info(f"Vosk model loaded from {model_path}")
+        return cls._model
+
+    @classmethod
+    def start_session(cls, project_id):
+        return LiveTranscriptionSession(project_id, cls.get_model())
+
+    @staticmethod
+    def is_question(text):
+        words = WORD_RE.findall(text.lower())
+        if len(words) < 2:
+            return False
+        return words[0] in QUESTION_WORDS or bool(QUESTION_PARTICLES.intersection(words[:4]))
+
+    @classmethod
+    def detect_questions(cls, text):
+        return [f"{text.strip().capitalize()}?"] if cls.is_question(text) else []
+
+
+class LiveTranscriptionSession:
+    """Распознавание одной защиты: принимает PCM-кадры и отдает события для клиента."""
+
+    def __init__(self, project_id, model):
+        from vosk import KaldiRecognizer
+        self.project_id = project_id
+        self.sample_rate = getattr(settings, 'LIVE_TRANSCRIPTION_SAMPLE_RATE', 16000)
+        self.recognizer = KaldiRecognizer(model, self.sample_rate)
+        self.transcript = []
+        self.questions = []
+        self.last_partial = ''
+        self.finished = False
+        self.saved = False
+
+    def feed(self, frame):
+        # frame — PCM s16le моно с частотой sample_rate
+        if self.recognizer.AcceptWaveform(frame):
+            return self._final_event(json.loads(self.recognizer.Result()).get('text', ''))
+
+        partial = json.loads(self.recognizer.PartialResult()).get('partial', '')
+        if partial == self.last_partial:
+            return []
+        self.last_partial = partial
+        return [{'type': 'partial', 'text': partial}]
+
+    def finish(self):
+        if self.finished:
+            return []
+        self.finished = True
+        return self._final_event(json.loads(self.recognizer.FinalResult()).get('text', ''))
+
+    def _final_event(self, text):
+        self.last_partial = ''
+        if not text:
+            return []
+        questions = LiveTranscriptionService.detect_questions(text)
+        self.transcript.append(text)
+        self.questions.extend(questions)
+        return [{'type': 'final', 'text': text, 'questions': questions}]
+
+    def save(self):
+        # Лемматизация и запись идут в очереди nlp: spaCy в веб-процессе не загружается
+        if self.saved or not self.questions:
+            return
+        from audio.task import save_live_questions_task
+        save_live_questions_task.delay(self.project_id, self.questions)
+        self.saved = True
+        logger.info(f"Live session for project {self.project_id} sent {len(self.questions)} questions to nlp")
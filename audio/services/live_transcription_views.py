@@ -0,0 +1,69 @@
+# ASGI-обработчик WebSocket для расшифровки во время защиты
+import json
+import re
+import logging
+
+from asgiref.sync import sync_to_async
+
+from audio.models import Project
+from audio.services.live_transcription_service import LiveTranscriptionService
+
+logger = logging.getLogger(__name__)
+
+LIVE_PATH_RE = re.compile(r'^/(?:api/)?ws/transcribe/(?P<project_id>\d+)/?$')
+
+
+async def live_transcription(scope, receive, send):
+    """
+    ws://<host>/api/ws/transcribe/<ID_Project>/
+
+    Клиент шлет бинарные кадры PCM s16le, 16 кГц, моно (лучше по 100–250 мс)
+    и текст {"type": "stop"} в конце защиты. Сервер отвечает JSON-событиями
+    {"type": "partial", "text": ...} и {"type": "final", "text": ..., "questions": [...]}.
+    """
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    match = LIVE_PATH_RE.match(scope['path'])
+    if match is None:
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+
+    project_id = int(match['project_id'])
+    if not await sync_to_async(Project.objects.filter(ID=project_id).exists)():
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+
+    session = await sync_to_async(LiveTranscriptionService.start_session, thread_sensitive=False)(project_id)
+    await send({'type': 'websocket.accept'})
+
+    async def send_events(events):
+        for event in events:
+            await send({'type': 'websocket.send', 'text': json.dumps(event, ensure_ascii=False)})
+
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+
+            if message.get('bytes'):
+                events = await sync_to_async(session.feed, thread_sensitive=False)(message['bytes'])
+                await send_events(events)
+            elif message.get('text'):
+                try:
+                    command = json.loads(message['text']).get('type')
+                except (ValueError, AttributeError):
+                    command = None
+                if command == 'stop':
+                    await send_events(await sync_to_async(session.finish, thread_sensitive=False)())
+                    await send({'type': 'websocket.close', 'code': 1000})
+                    break
+    except Exception as e:
+        logger.error(f"Live transcription error: {str(e)}")
+        await send({'type': 'websocket.close', 'code': 1011})
+    finally:
+        # Сохраняем распознанные вопросы даже при обрыве соединения
+        await sync_to_async(session.finish, thread_sensitive=False)()
+        await sync_to_async(session.save, thread_sensitive=False)()
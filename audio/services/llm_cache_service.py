@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import threading
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResultCache:
+    """
+    Дисковый кэш сгенерированных вопросов с вытеснением давно не использованных
+    записей (LRU по времени последнего обращения к файлу) при превышении размера.
+    Счетчики попаданий лежат в общем кэше статистики: к кэшу обращается дочерний
+    процесс воркера llm, а inspect llm_cache_stats выполняется в главном.
+    """
+
+    HITS_KEY = 'llm_cache:hits'
+    MISSES_KEY = 'llm_cache:misses'
+
+    @staticmethod
+    def get_directory():
+        return str(getattr(settings, 'LLM_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'llm')))
+
+    @staticmethod
+    def get_max_bytes():
+        return getattr(settings, 'LLM_CACHE_MAX_BYTES', 50 * 1024 * 1024)
+
+    @staticmethod
+    def make_key(text, model_path, params):
+        # Файл модели определяем по имени, размеру и времени изменения — без чтения 4 ГБ
+        try:
+            stat = os.stat(model_path)
+            model_id = f"{os.path.basename(model_path)}:{stat.st_size}:{int(stat.st_mtime)}"
+        except OSError:
+            model_id = os.path.basename(model_path)
+        payload = json.dumps({
+            'text': hashlib.sha256(text.encode('utf-8')).hexdigest(),
+            'model': model_id,
+            'params': params,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get_stats_cache():
+        return caches[getattr(settings, 'STATS_CACHE_ALIAS', 'stats')]
+
+    @classmethod
+    def get_path(cls, key):
+        return os.path.join(cls.get_directory(), f"{key}.json")
+
+    @classmethod
+    def get(cls, key):
+        path = cls.get_path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                questions = json.load(f)
+            os.utime(path)  # отмечаем обращение для LRU
+        except (OSError, ValueError):
+            cls._count(hit=False)
+            return None
+        cls._count(hit=True)
+        return questions
+
+    @classmethod
+    def set(cls, key, questions):
+        directory = cls.get_directory()
+        os.makedirs(directory, exist_ok=True)
+        path = cls.get_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(questions, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        cls.evict()
+
+    @classmethod
+    def evict(cls):
+        entries = cls._entries()
+        total = sum(size for _, size, _ in entries)
+        max_bytes = cls.get_max_bytes()
+        if total <= max_bytes:
+            return 0
+
+        removed = 0
+        for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        logger.info(f"LLM cache evicted {removed} entries")
+        return removed
+
+    @classmethod
+    def stats(cls):
+        entries = cls._entries()
+        counters = cls.get_stats_cache().get_many([cls.HITS_KEY, cls.MISSES_KEY])
+        hits, misses = counters.get(cls.HITS_KEY, 0), counters.get(cls.MISSES_KEY, 0)
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / lookups, 3) if lookups else None,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': cls.get_max_bytes(),
+        }
+
+    @classmethod
+    def _count(cls, hit):
+        # Обращения к кэшу идут из одного процесса (воркер llm -c 1), поэтому
+        # неатомарный incr файлового кэша здесь не теряет значения
+        cache = cls.get_stats_cache()
+        key = cls.HITS_KEY if hit else cls.MISSES_KEY
+        try:
+            if not cache.add(key, 1, timeout=None):
+                cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+        except Exception as exc:
+            logger.warning(f"LLM cache stats update failed: {str(exc)}")
+        logger.info(f"LLM cache {'hit' if hit else 'miss'}")
+
+    @classmethod
+    def _entries(cls):
+        entries = []
+        try:
+            with os.scandir(cls.get_directory()) as it:
+                for entry in it:
+                    if entry.name.endswith('.json'):
+                        stat = entry.stat()
+                        entries.append((entry.path, stat.st_size, stat.st_mtime))
+        except OSError:
+            pass
+        return entries
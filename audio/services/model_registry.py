@@ -0,0 +1,134 @@
+import os
+import socket
+import threading
+import time
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+class WhisperModelRegistry:
+    """
+    Загружает каждую модель Whisper один раз на процесс и отдает закэшированный экземпляр.
+    Статистика загрузки публикуется в общий кэш: модели живут в дочерних процессах
+    воркера, а inspect whisper_stats выполняется в главном.
+    """
+
+    _models = {}
+    _stats = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_config(cls):
+        return {
+            'name': getattr(settings, 'WHISPER_MODEL', 'small'),
+            'device': getattr(settings, 'WHISPER_DEVICE', 'cpu'),
+            'threads': getattr(settings, 'WHISPER_THREADS', None),
+        }
+
+    @classmethod
+    def get_model(cls, name=None, device=None, threads=None):
+        config = cls.get_config()
+        key = (name or config['name'], device or config['device'])
+
+        model = cls._models.get(key)
+        if model is not None:
+            return model
+
+        with cls._lock:
+            # Повторная проверка: модель могла загрузиться в соседнем потоке
+            model = cls._models.get(key)
+            if model is None:
+                model = cls._load(*key, threads=threads or config['threads'])
+                cls._models[key] = model
+        return model
+
+    @classmethod
+    def _load(cls, name, device, threads=None):
+        # whisper тянет за собой torch, поэтому импортируем его только при загрузке модели
+        import whisper
+
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+
+        rss_before = cls.get_rss_mb()
+        started = time.perf_counter()
+        model = whisper.load_model(name, device=device)
+        load_time = time.perf_counter() - started
+        rss_after = cls.get_rss_mb()
+
+        cls._stats[(name, device)] = {
+            'model': name,
+            'device': device,
+            'threads': threads,
+            'load_time_sec': round(load_time, 3),
+            'rss_mb': rss_after,
+            'rss_delta_mb': (
+                round(rss_after - rss_before, 1)
+                if rss_before is not None and rss_after is not None else None
+            ),
+            'pid': os.getpid(),
+        }
+        logger.info(
+            f"Whisper model '{name}' loaded on {device} in {load_time:.2f}s "
+            f"(rss={rss_after} MB, pid={os.getpid()})"
+        )
+        cls.publish()
+        return model
+
+    @classmethod
+    def warmup(cls):
+        return cls.get_model()
+
+    @classmethod
+    def stats(cls):
+        return list(cls._stats.values())
+
+    @staticmethod
+    def get_stats_cache():
+        return caches[getattr(settings, 'STATS_CACHE_ALIAS', 'stats')]
+
+    @staticmethod
+    def stats_key(pid):
+        return f"whisper_stats:{socket.gethostname()}:{pid}"
+
+    @classmethod
+    def publish(cls):
+        try:
+            cls.get_stats_cache().set(cls.stats_key(os.getpid()), cls.stats(), timeout=None)
+        except Exception as exc:
+            logger.warning(f"Whisper stats publish failed: {str(exc)}")
+
+    @classmethod
+    def shared_stats(cls, pids):
+        """Статистика, опубликованная процессами pids (дочерними процессами воркера)."""
+        published = cls.get_stats_cache().get_many([cls.stats_key(pid) for pid in pids])
+        return [entry for pid in pids for entry in published.get(cls.stats_key(pid), [])]
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._models.clear()
+            cls._stats.clear()
+        cls.get_stats_cache().delete(cls.stats_key(os.getpid()))
+
+    @staticmethod
+    def get_rss_mb():
+        # Текущий RSS процесса; на системах без /proc берем пиковое значение
+        try:
+            with open('/proc/self/statm') as f:
+                pages = int(f.read().split()[1])
+            return round(pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+        except (OSError, ValueError, AttributeError):
+            if resource is None:
+                return None
+            return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
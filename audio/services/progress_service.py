@@ -0,0 +1,58 @@
+import logging
+
+from celery import current_app
+
+logger = logging.getLogger(__name__)
+
+
+class JobProgressService:
+    """
+    Прогресс обработки записи по этапам. Хранится в result backend
+    (django_celery_results) под id обработки, а не под id отдельной задачи цепочки.
+    """
+
+    # Доля общего прогресса, достигнутая к концу этапа
+    STAGES = {
+        'queued': 0,
+        'decoded': 10,
+        'transcribing': 10,
+        'transcribed': 80,
+        'questions_extracted': 90,
+        'saved': 100,
+    }
+    PROGRESS = 'PROGRESS'
+
+    @classmethod
+    def report(cls, job_id, stage, state=PROGRESS, **meta):
+        meta = {'stage': stage, 'progress': cls.STAGES[stage], **meta}
+        cls._store(job_id, meta, state)
+        return meta
+
+    @classmethod
+    def report_transcribing(cls, job_id, done, total, **meta):
+        # Распознавание занимает этапы между decoded и transcribed
+        start, end = cls.STAGES['decoded'], cls.STAGES['transcribed']
+        meta = {
+            'stage': 'transcribing',
+            'progress': round(start + (end - start) * done / total),
+            'transcribed_percent': round(100 * done / total),
+            **meta,
+        }
+        cls._store(job_id, meta, cls.PROGRESS)
+        return meta
+
+    @classmethod
+    def report_failure(cls, job_id, exc):
+        try:
+            current_app.backend.mark_as_failure(job_id, exc)
+        except Exception as e:
+            logger.error(f"Failed to store job {job_id} failure: {str(e)}")
+
+    @classmethod
+    def _store(cls, job_id, meta, state):
+        # Ошибка записи прогресса не должна ронять обработку
+        try:
+            current_app.backend.store_result(job_id, meta, state)
+        except Exception as e:
+            logger.error(f"Failed to store job {job_id} progress: {str(e)}")
+
@@ -0,0 +1,108 @@
+import logging
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+
+class QueryPlanService:
+    """
+    Строит select_related/prefetch_related по дереву сериализатора:
+    - вложенный сериализатор по ForeignKey/OneToOne -> select_related (один JOIN);
+    - many=True по обратной связи или ManyToMany -> Prefetch с собственным планом;
+    - source с точкой ("ID_Segment.Start") -> select_related до последнего поля.
+
+    Поля, которые нельзя вывести из модели (SerializerMethodField), сериализатор
+    описывает сам в методе plan_queryset(queryset, prefix).
+    """
+
+    @classmethod
+    def plan(cls, queryset, serializer):
+        if isinstance(serializer, serializers.ListSerializer):
+            serializer = serializer.child
+        if getattr(getattr(serializer, 'Meta', None), 'model', None) is not queryset.model:
+            return queryset
+
+        select, prefetch = [], []
+        queryset = cls._walk(queryset, serializer, queryset.model, '', select, prefetch)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        logger.debug(
+            f"Query plan for {queryset.model.__name__}: select_related={select}, "
+            f"prefetch_related={[getattr(lookup, 'prefetch_through', lookup) for lookup in prefetch]}"
+        )
+        return queryset
+
+    @classmethod
+    def _walk(cls, queryset, serializer, model, prefix, select, prefetch):
+        for field in serializer.fields.values():
+            if field.write_only or field.source == '*':
+                continue
+
+            path = field.source.split('.')
+            relations, related_model = cls._relations(model, path)
+
+            if isinstance(field, serializers.ListSerializer):
+                # Список по обратной связи или ManyToMany: отдельный запрос на все строки сразу
+                if len(relations) == 1 and (relations[0].one_to_many or relations[0].many_to_many):
+                    prefetch.append(Prefetch(
+                        prefix + cls._accessor(relations[0]),
+                        queryset=cls.plan(related_model._default_manager.all(), field.child),
+                    ))
+                continue
+
+            if isinstance(field, serializers.ManyRelatedField):
+                # Список id по обратной связи (?expand=): достаточно prefetch без вложенного плана
+                if len(relations) == 1 and (relations[0].one_to_many or relations[0].many_to_many):
+                    prefetch.append(prefix + cls._accessor(relations[0]))
+                continue
+
+            # Цепочка ForeignKey/OneToOne до поля: ее можно взять JOIN-ом
+            single = [relation for relation in relations if relation.many_to_one or relation.one_to_one]
+            if len(single) != len(relations) or not relations:
+                continue
+
+            if isinstance(field, serializers.BaseSerializer):
+                lookup = prefix + '__'.join(relation.name for relation in relations)
+                select.append(lookup)
+                queryset = cls._walk(queryset, field, related_model, lookup + '__', select, prefetch)
+            elif len(path) > len(relations) or not isinstance(field, serializers.RelatedField):
+                # "ID_Segment.Start": нужен объект связи, а не только его id
+                select.append(prefix + '__'.join(relation.name for relation in relations))
+
+        hook = getattr(serializer, 'plan_queryset', None)
+        if hook is not None:
+            queryset = hook(queryset, prefix)
+        return queryset
+
+    @staticmethod
+    def _relations(model, path):
+        """Связи модели по пути source, пока путь идет по связям."""
+        relations = []
+        for name in path:
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                # Обратные связи доступны под именем accessor (commissioncomposition_set)
+                field = next(
+                    (
+                        relation for relation in model._meta.related_objects
+                        if relation.get_accessor_name() == name
+                    ),
+                    None,
+                )
+            if field is None or not field.is_relation:
+                break
+            relations.append(field)
+            model = field.related_model
+        return relations, model
+
+    @staticmethod
+    def _accessor(relation):
+        if relation.auto_created and not relation.concrete:
+            return relation.get_accessor_name()
+        return relation.name
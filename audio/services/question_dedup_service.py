@@ -0,0 +1,166 @@
+import re
+import zlib
+import threading
+import logging
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r'\w+')
+
+# Вопросительные и служебные слова не отличают один вопрос от другого
+STOP_WORDS = frozenset("""
+как какой какая какое какие какого каких каким какими какую чем что чего почему зачем сколько
+кто где когда куда откуда ли же бы вы вас вам ваш ваша ваше ваши вашего вашей вашем мы нас нам наш
+наша наше наши это этот эта эти этого этой того тот такое такой такая такие там тут при для про
+над под без или есть был была было были будет именно также еще уже очень можно нужно
+""".split())
+STEM_LENGTH = 5
+
+
+class QuestionDeduplicationService:
+    """
+    Склеивает повторы и перефразировки вопросов: все вопросы векторизуются
+    одним батчем, похожие находятся по матрице косинусной близости, от каждой
+    группы остается первый прозвучавший вопрос.
+
+    По умолчанию используются эмбеддинги QUESTION_EMBEDDING_MODEL
+    (sentence-transformers), они склеивают и перефразировки другими словами.
+    Если модель не задана, пакет не установлен или модель не загрузилась,
+    склейка только лексическая: TF-IDF по символьным триграммам слов, и
+    склеиваются лишь вопросы, одна формулировка которых содержит все значимые
+    слова другой и добавляет меньше слов, чем у них общих ("Какой алгоритм
+    сортировки вы использовали?" и "Какие алгоритмы сортировки использовались?").
+    Вопросы, отличающиеся значимым словом ("...сортировки..." и "...поиска...",
+    "Что такое граф?" и "Что такое взвешенный граф?"), не склеиваются, а
+    перефразировки с другими словами лексическая склейка пропускает.
+    """
+
+    HASH_DIM = 4096
+    NGRAM = 3
+
+    _encoder = None
+    _encoder_failed = False
+    _lock = threading.Lock()
+
+    @classmethod
+    def is_enabled(cls):
+        return getattr(settings, 'QUESTION_DEDUP_ENABLED', True)
+
+    @classmethod
+    def get_threshold(cls):
+        if cls.get_encoder() is not None:
+            return getattr(settings, 'QUESTION_DEDUP_THRESHOLD', 0.85)
+        return getattr(settings, 'QUESTION_DEDUP_LEXICAL_THRESHOLD', 0.65)
+
+    @classmethod
+    def get_config(cls):
+        """Параметры, от которых зависит результат склейки (для ключей кэша)."""
+        if not cls.is_enabled():
+            return None
+        model_name = getattr(settings, 'QUESTION_EMBEDDING_MODEL', None) if cls.get_encoder() is not None else None
+        return {'model': model_name, 'threshold': cls.get_threshold()}
+
+    @classmethod
+    def get_encoder(cls):
+        model_name = getattr(settings, 'QUESTION_EMBEDDING_MODEL', None)
+        if not model_name or cls._encoder_failed:
+            return None
+        if cls._encoder is None:
+            with cls._lock:
+                if cls._encoder is None and not cls._encoder_failed:
+                    try:
+                        from sentence_transformers import SentenceTransformer
+                        cls._encoder = SentenceTransformer(model_name)
+                    except Exception as e:
+                        # Нет пакета или модель не скачалась: склейка не должна ронять обработку
+                        logger.warning(f"Embedding model {model_name} is unavailable, using lexical dedup: {str(e)}")
+                        cls._encoder_failed = True
+        return cls._encoder
+
+    @classmethod
+    def embed(cls, questions):
+        """Матрица (n, d) с нормированными строками."""
+        encoder = cls.get_encoder()
+        if encoder is not None:
+            vectors = np.asarray(encoder.encode(questions, batch_size=64), dtype=np.float32)
+        else:
+            vectors = cls.ngram_vectors(questions)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    @classmethod
+    def ngram_vectors(cls, questions):
+        counts = np.zeros((len(questions), cls.HASH_DIM), dtype=np.float32)
+        for row, question in enumerate(questions):
+            for word in WORD_RE.findall(question.lower()):
+                padded = f" {word} "
+                for i in range(max(1, len(padded) - cls.NGRAM + 1)):
+                    counts[row, zlib.crc32(padded[i:i + cls.NGRAM].encode('utf-8')) % cls.HASH_DIM] += 1
+
+        # Частые в этом наборе триграммы ("как", "ваш") весят меньше
+        document_frequency = np.count_nonzero(counts, axis=0)
+        idf = np.log((1 + len(questions)) / (1 + document_frequency)) + 1
+        return np.log1p(counts) * idf
+
+    @staticmethod
+    def content_stems(question):
+        # Начало слова вместо леммы: "алгоритмы" и "алгоритм", "использовали" и "использовались" совпадают
+        return {
+            word[:STEM_LENGTH] for word in WORD_RE.findall(question.lower())
+            if len(word) > 2 and word not in STOP_WORDS
+        }
+
+    @classmethod
+    def similarity(cls, questions):
+        """Матрица близости (n, n); лексическая близость обнуляется для вопросов с разными значимыми словами."""
+        embeddings = cls.embed(questions)
+        similarity = embeddings @ embeddings.T
+        if cls.get_encoder() is None:
+            stems = [cls.content_stems(question) for question in questions]
+            for i in range(len(questions)):
+                for j in range(i + 1, len(questions)):
+                    if not cls.same_content(stems[i], stems[j]):
+                        similarity[i, j] = similarity[j, i] = 0
+        return similarity
+
+    @staticmethod
+    def same_content(first, second):
+        shorter, longer = sorted((first, second), key=len)
+        return shorter <= longer and len(longer - shorter) < len(shorter)
+
+    @classmethod
+    def cluster(cls, similarity, threshold):
+        """Номер группы для каждого вопроса: номер первого вопроса группы."""
+        labels = np.full(len(similarity), -1)
+        for leader in range(len(similarity)):
+            if labels[leader] >= 0:
+                continue
+            labels[(labels < 0) & (similarity[leader] >= threshold)] = leader
+        return labels
+
+    @classmethod
+    def unique_indices(cls, questions, threshold=None):
+        """Номера оставляемых вопросов, по порядку."""
+        if len(questions) < 2:
+            return list(range(len(questions)))
+
+        labels = cls.cluster(cls.similarity(questions), threshold or cls.get_threshold())
+        leaders = np.flatnonzero(labels == np.arange(len(questions)))
+        logger.info(f"Question dedup: {len(questions)} -> {len(leaders)}")
+        return leaders.tolist()
+
+    @classmethod
+    def is_duplicate(cls, question, previous, threshold=None):
+        """Повторяет ли вопрос один из previous."""
+        if not previous:
+            return False
+        similarity = cls.similarity(list(previous) + [question])
+        return bool(similarity[-1, :-1].max() >= (threshold or cls.get_threshold()))
+
+    @classmethod
+    def deduplicate(cls, questions, threshold=None):
+        return [questions[index] for index in cls.unique_indices(questions, threshold)]
@@ -0,0 +1,186 @@
+import os
+import socket
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from audio.models import Project, Question, QuestionGenerationJob
+from audio.services.table_version_service import TableVersionService
+from audio.services.transcription_service import TranscriptionService
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionGenerationService:
+    """
+    Очередь генерации вопросов локальной LLM. Задания пишутся в БД из любого
+    процесса, а выполняет их только воркер очереди llm, где модель загружена
+    один раз. Накопившиеся задания нескольких проектов выполняются одновременно,
+    по одному на контекст модели (LLM_PARALLEL_CONTEXTS).
+    """
+
+    @classmethod
+    def submit(cls, project_id, text):
+        from audio.task import generate_questions_task
+
+        job = QuestionGenerationJob.objects.create(project_id=project_id, text=text)
+        # Задача только будит воркер: он заберет все ожидающие задания
+        transaction.on_commit(generate_questions_task.delay)
+        return job
+
+    @staticmethod
+    def get_timeout():
+        return getattr(settings, 'LLM_JOB_TIMEOUT', 15 * 60)
+
+    @staticmethod
+    def worker_name(pid=None):
+        return f"{socket.gethostname()}:{pid or os.getpid()}"
+
+    @classmethod
+    def claim_batch(cls, size):
+        # RUNNING без отметок дольше таймаута — задание упавшего воркера, забираем его заново
+        now = timezone.now()
+        stale = Q(
+            status=QuestionGenerationJob.Status.RUNNING,
+            heartbeat_at__lt=now - timedelta(seconds=cls.get_timeout()),
+        )
+        with transaction.atomic():
+            jobs = list(
+                QuestionGenerationJob.objects
+                .select_for_update(skip_locked=True)
+                .filter(Q(status=QuestionGenerationJob.Status.PENDING) | stale)
+                .order_by('id')[:size]
+            )
+            QuestionGenerationJob.objects.filter(id__in=[job.id for job in jobs]).update(
+                status=QuestionGenerationJob.Status.RUNNING, worker=cls.worker_name(), heartbeat_at=now,
+            )
+        reclaimed = [job.id for job in jobs if job.status == QuestionGenerationJob.Status.RUNNING]
+        if reclaimed:
+            logger.warning(f"Reclaimed abandoned LLM jobs {reclaimed}")
+        return jobs
+
+    @classmethod
+    def release_abandoned(cls):
+        """
+        Задания, которые выполнял уже не существующий процесс этой машины, снова PENDING.
+        Вызывается при старте процесса воркера llm, не дожидаясь таймаута.
+        """
+        host = f"{socket.gethostname()}:"
+        released = []
+        running = QuestionGenerationJob.objects.filter(
+            status=QuestionGenerationJob.Status.RUNNING, worker__startswith=host
+        )
+        for job_id, worker in running.values_list('id', 'worker'):
+            try:
+                os.kill(int(worker[len(host):]), 0)
+                continue
+            except ProcessLookupError:
+                pass
+            except (PermissionError, ValueError):
+                continue
+            updated = QuestionGenerationJob.objects.filter(
+                id=job_id, status=QuestionGenerationJob.Status.RUNNING, worker=worker
+            ).update(status=QuestionGenerationJob.Status.PENDING, worker='')
+            if updated:
+                released.append(job_id)
+        if released:
+            logger.warning(f"Released LLM jobs of dead workers: {released}")
+        return released
+
+    @classmethod
+    def run_pending(cls):
+        from audio.services.LLMProcessor_service import LLMProcessor
+
+        processor = LLMProcessor.get_instance()
+        batch_size = getattr(settings, 'LLM_JOBS_PER_BATCH', 8)
+        processed = 0
+
+        # Окна всех заданий делят контексты модели: пока одно задание ждет
+        # свободный контекст, другие генерируют
+        with ThreadPoolExecutor(max_workers=max(1, processor.config['parallel'])) as executor:
+            while True:
+                jobs = cls.claim_batch(batch_size)
+                if not jobs:
+                    break
+                logger.info(
+                    f"LLM batch of {len(jobs)} jobs for projects {sorted({job.project_id for job in jobs})}"
+                )
+                stop = threading.Event()
+                heartbeat = threading.Thread(target=cls.keep_alive, args=([job.id for job in jobs], stop), daemon=True)
+                heartbeat.start()
+                try:
+                    list(executor.map(lambda job: cls.run_job_in_thread(processor, job), jobs))
+                finally:
+                    stop.set()
+                    heartbeat.join()
+                processed += len(jobs)
+
+        return processed
+
+    @classmethod
+    def keep_alive(cls, job_ids, stop):
+        """
+        Отметки заданий пачки, пока они выполняются или ждут контекст: долгое окно
+        без нового вопроса не должно считаться брошенным и забираться другим воркером.
+        """
+        interval = max(1, cls.get_timeout() // 3)
+        try:
+            while not stop.wait(interval):
+                QuestionGenerationJob.objects.filter(
+                    id__in=job_ids, status=QuestionGenerationJob.Status.RUNNING, worker=cls.worker_name()
+                ).update(heartbeat_at=timezone.now())
+        except Exception as e:
+            logger.error(f"LLM heartbeat failed: {str(e)}")
+        finally:
+            connection.close()
+
+    @classmethod
+    def run_job_in_thread(cls, processor, job):
+        try:
+            cls.run_job(processor, job)
+        finally:
+            # У каждого потока свое соединение с БД
+            connection.close()
+
+    @classmethod
+    def run_job(cls, processor, job):
+        max_questions = getattr(settings, 'LLM_MAX_QUESTIONS', 20)
+        # Все записи задания идут с проверкой владельца: если задание все же забрал
+        # другой воркер, этот перестает писать, и вопросы не дублируются
+        owned = QuestionGenerationJob.objects.filter(id=job.id, worker=cls.worker_name())
+        owned.update(heartbeat_at=timezone.now())
+        # Задание, подхваченное после падения воркера, уже могло записать часть вопросов
+        written = set(job.questions)
+        try:
+            # Каждый вопрос пишется сразу, чтобы он появился в GET /api/questions/
+            # до конца генерации; вместе с ним обновляется отметка задания
+            for question in processor.stream_questions(job.text, max_questions=max_questions):
+                if question in written:
+                    continue
+                with transaction.atomic():
+                    if not owned.update(questions=job.questions + [question], heartbeat_at=timezone.now()):
+                        logger.warning(f"LLM job {job.id} was reclaimed by another worker, stopping")
+                        return
+                    # Вопросы в проекте хранятся лемматизированными, как найденные в расшифровке
+                    Question.objects.create(
+                        Text=TranscriptionService.process_question(question), ID_Project_id=job.project_id,
+                    )
+                    TableVersionService.bump(Question)
+                job.questions.append(question)
+                written.add(question)
+            Project.objects.filter(ID=job.project_id).update(Status="Готов")
+            TableVersionService.bump(Project)
+            job.status = QuestionGenerationJob.Status.DONE
+        except Exception as e:
+            logger.error(f"LLM job {job.id} failed: {str(e)}")
+            job.error = str(e)
+            job.status = QuestionGenerationJob.Status.FAILED
+        owned.update(
+            questions=job.questions, status=job.status, error=job.error, finished_at=timezone.now(),
+        )
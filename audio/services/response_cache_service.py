@@ -0,0 +1,90 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCacheService:
+    """
+    Хранилище ответов API (ResponseCacheMixin) и счетчики попаданий по вьюсетам.
+    Счетчики лежат в кэше статистики (STATS_CACHE_ALIAS), который видят все
+    процессы сервера: в кэше ответов их стирали бы вытеснение и истечение записей.
+    """
+
+    @staticmethod
+    def is_enabled():
+        return getattr(settings, 'RESPONSE_CACHE_ENABLED', True)
+
+    @staticmethod
+    def get_cache():
+        return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+    @staticmethod
+    def get_stats_cache():
+        return caches[getattr(settings, 'STATS_CACHE_ALIAS', 'stats')]
+
+    @staticmethod
+    def get_timeout():
+        return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 12 * 60 * 60)
+
+    @classmethod
+    def get(cls, view_name, key):
+        data = cls.get_cache().get(key)
+        cls._count(view_name, hit=data is not None)
+        return data
+
+    @classmethod
+    def set(cls, key, data):
+        cls.get_cache().set(key, data, cls.get_timeout())
+
+    @staticmethod
+    def view_names():
+        # Импорт внутри метода: audio.urls импортирует вьюсеты, а они — этот сервис
+        from audio.urls import router
+        from audio.views.mixins import ResponseCacheMixin
+
+        return sorted({
+            viewset.__name__ for _, viewset, _ in router.registry if issubclass(viewset, ResponseCacheMixin)
+        })
+
+    @staticmethod
+    def counter_keys(view_name):
+        return f"response_cache:hits:{view_name}", f"response_cache:misses:{view_name}"
+
+    @classmethod
+    def stats(cls):
+        stats = {}
+        for view_name in cls.view_names():
+            hits_key, misses_key = cls.counter_keys(view_name)
+            counters = cls.get_stats_cache().get_many([hits_key, misses_key])
+            if not counters:
+                continue
+            hits, misses = counters.get(hits_key, 0), counters.get(misses_key, 0)
+            lookups = hits + misses
+            stats[view_name] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_ratio': round(hits / lookups, 3) if lookups else None,
+            }
+        return stats
+
+    @classmethod
+    def reset_stats(cls):
+        cls.get_stats_cache().delete_many([key for name in cls.view_names() for key in cls.counter_keys(name)])
+
+    @classmethod
+    def _count(cls, view_name, hit):
+        cache = cls.get_stats_cache()
+        hits_key, misses_key = cls.counter_keys(view_name)
+        key = hits_key if hit else misses_key
+        # add создает счетчик, только если его еще нет; в кэше статистики
+        # (audio.cache.CounterFileBasedCache) add и incr выполняются под блокировкой
+        try:
+            if not cache.add(key, 1, timeout=None):
+                cache.incr(key)
+        except ValueError:
+            # Счетчик удален между add и incr (reset_stats)
+            cache.set(key, 1, timeout=None)
+        logger.debug(f"Response cache {'hit' if hit else 'miss'}: {view_name}")
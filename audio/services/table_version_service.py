@@ -0,0 +1,39 @@
+import logging
+
+from django.db.models import F
+from django.utils import timezone
+
+from audio.models import TableVersion
+
+logger = logging.getLogger(__name__)
+
+
+class TableVersionService:
+    """Счетчики версий таблиц: по ним строятся ETag/Last-Modified справочников."""
+
+    @staticmethod
+    def table_name(model):
+        return model._meta.label
+
+    @classmethod
+    def bump(cls, *models):
+        # Вызывается в транзакции изменения: при откате версия тоже откатывается
+        for model in models:
+            table = cls.table_name(model)
+            updated = TableVersion.objects.filter(table=table).update(
+                version=F('version') + 1, updated_at=timezone.now()
+            )
+            if not updated:
+                TableVersion.objects.get_or_create(table=table, defaults={'version': 1})
+
+    @classmethod
+    def get(cls, models):
+        """(версии таблиц по порядку models, время последнего изменения) одним запросом."""
+        tables = [cls.table_name(model) for model in models]
+        rows = {
+            table: (version, updated_at)
+            for table, version, updated_at in TableVersion.objects
+            .filter(table__in=tables).values_list('table', 'version', 'updated_at')
+        }
+        last_modified = max((updated_at for _, updated_at in rows.values()), default=None)
+        return [rows.get(table, (0, None))[0] for table in tables], last_modified
@@ -0,0 +1,65 @@
+import hashlib
+import logging
+
+from django.conf import settings
+
+from audio.models import TranscriptCache
+from audio.services.transcription_service import TranscriptionService
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptCacheService:
+    """Готовые расшифровки и вопросы по хэшу содержимого записи."""
+
+    HASH_BLOCK_SIZE = 1024 * 1024
+
+    @staticmethod
+    def model_version():
+        # При смене модели или настроек распознавания старые записи кэша не используются
+        return "|".join([
+            f"whisper={getattr(settings, 'WHISPER_MODEL', 'small')}",
+            f"spacy={getattr(settings, 'SPACY_MODEL', 'ru_core_news_sm')}",
+            f"vad={int(getattr(settings, 'AUDIO_VAD_ENABLED', False))}",
+            f"words={int(getattr(settings, 'WHISPER_WORD_TIMESTAMPS', True))}",
+        ])
+
+    @classmethod
+    def hash_file(cls, file):
+        # Запасной путь, если файл пришел не через Hashing*UploadHandler
+        hasher = hashlib.sha256()
+        for chunk in file.chunks(cls.HASH_BLOCK_SIZE):
+            hasher.update(chunk)
+        file.seek(0)
+        return hasher.hexdigest()
+
+    @classmethod
+    def get(cls, content_hash):
+        if not content_hash:
+            return None
+        return TranscriptCache.objects.filter(
+            content_hash=content_hash, model_version=cls.model_version()
+        ).first()
+
+    @classmethod
+    def store(cls, content_hash, text, questions, segments=None, question_segments=None):
+        if not content_hash:
+            return None
+        cached, _ = TranscriptCache.objects.update_or_create(
+            content_hash=content_hash,
+            model_version=cls.model_version(),
+            defaults={
+                'text': text,
+                'questions': questions,
+                'segments': segments or [],
+                'question_segments': question_segments or [],
+            },
+        )
+        return cached
+
+    @classmethod
+    def apply(cls, cached, project_id):
+        # Вопросы в кэше уже лемматизированы, spaCy в веб-процессе не нужен
+        question_segments = cached.question_segments or [None] * len(cached.questions)
+        TranscriptionService.store_transcript(cached.segments, cached.questions, question_segments, project_id)
+        logger.info(f"Transcript cache hit {cached.content_hash[:12]} for project {project_id}")
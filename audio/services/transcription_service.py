@@ -1,24 +1,166 @@
-import spacy
-from audio.models import Project, Question  # Импорт из текущего приложения
+import math
+import bisect
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from audio.models import Project, Question, TranscriptSegment  # Импорт из текущего приложения
+from audio.services.table_version_service import TableVersionService
+
 
 class TranscriptionService:
-    nlp = spacy.load("ru_core_news_sm")
+    # spaCy загружается при первом обращении, а не при импорте модуля:
+    # веб-процессам и командам manage.py он не нужен
+    _nlp = None
+    _lock = threading.Lock()
+
+    # Для границ предложений нужен parser, для лемм — morphologizer и lemmatizer
+    SENTENCE_DISABLED_PIPES = ['ner']
+    LEMMA_DISABLED_PIPES = ['parser', 'ner']
+    PIPE_BATCH_SIZE = 64
+
+    @classmethod
+    def get_nlp(cls):
+        if cls._nlp is None:
+            with cls._lock:
+                if cls._nlp is None:
+                    import spacy
+                    cls._nlp = spacy.load(getattr(settings, 'SPACY_MODEL', 'ru_core_news_sm'))
+        return cls._nlp
 
     @classmethod
     def extract_questions(cls, text):
-        doc = cls.nlp(text)
-        return [sent.text.strip() for sent in doc.sents if sent.text.strip().endswith('?')]
+        return [question for question, _ in cls.extract_question_spans(text)]
+
+    @classmethod
+    def extract_question_spans(cls, text):
+        """Вопросы вместе с позицией начала в тексте: [(вопрос, start_char)]."""
+        nlp = cls.get_nlp()
+        with nlp.select_pipes(disable=cls._present(cls.SENTENCE_DISABLED_PIPES)):
+            doc = nlp(text)
+        return [
+            (sent.text.strip(), sent.start_char + len(sent.text) - len(sent.text.lstrip()))
+            for sent in doc.sents if sent.text.strip().endswith('?')
+        ]
+
+    @staticmethod
+    def join_segments(segments):
+        """Текст расшифровки и позиция начала каждого сегмента в нем."""
+        offsets = []
+        parts = []
+        position = 0
+        for segment in segments:
+            text = segment['text'].strip()
+            offsets.append(position)
+            parts.append(text)
+            position += len(text) + 1
+        return " ".join(parts), offsets
+
+    @classmethod
+    def extract_segment_questions(cls, segments, deduplicate=True):
+        """
+        Вопросы из сегментов расшифровки: (лемматизированные вопросы,
+        номер сегмента, в котором начинается каждый вопрос).
+        """
+        from audio.services.question_dedup_service import QuestionDeduplicationService
+
+        text, offsets = cls.join_segments(segments)
+        spans = cls.extract_question_spans(text)
+        if deduplicate and QuestionDeduplicationService.is_enabled():
+            keep = QuestionDeduplicationService.unique_indices([question for question, _ in spans])
+            spans = [spans[index] for index in keep]
+
+        question_segments = [
+            bisect.bisect_right(offsets, start) - 1 if offsets else None
+            for _, start in spans
+        ]
+        return cls.process_questions([question for question, _ in spans]), question_segments
 
     @classmethod
     def process_question(cls, question):
-        doc = cls.nlp(question)
-        return " ".join([token.lemma_ for token in doc if not token.is_stop])
+        return cls.process_questions([question])[0]
+
+    @classmethod
+    def process_questions(cls, questions):
+        docs = cls.get_nlp().pipe(
+            questions,
+            disable=cls._present(cls.LEMMA_DISABLED_PIPES),
+            batch_size=cls.PIPE_BATCH_SIZE,
+        )
+        return [" ".join([token.lemma_ for token in doc if not token.is_stop]) for doc in docs]
 
     @classmethod
     def save_questions(cls, questions, project_id):
-        project = Project.objects.get(ID=project_id)
-        for question in questions:
-            processed = cls.process_question(question)
-            Question.objects.create(Text=processed, ID_Project=project)
-        project.Status = "Готов"
-        project.save()
\ No newline at end of file
+        cls.store_questions(cls.process_questions(questions), project_id)
+
+    @classmethod
+    def store_questions(cls, processed, project_id, segments=None):
+        # processed — уже лемматизированные вопросы (см. process_questions),
+        # segments — сегмент расшифровки для каждого вопроса (или None)
+        segments = segments or [None] * len(processed)
+        with transaction.atomic():
+            project = Project.objects.get(ID=project_id)
+            Question.objects.bulk_create([
+                Question(Text=text, ID_Project=project, ID_Segment=segment)
+                for text, segment in zip(processed, segments)
+            ])
+            TableVersionService.bump(Question)
+            project.Status = "Готов"
+            project.save(update_fields=['Status'])
+
+    @classmethod
+    def store_transcript(cls, segments, processed, question_segments, project_id):
+        """Сегменты расшифровки и вопросы со ссылками на них, одной транзакцией."""
+        with transaction.atomic():
+            created = TranscriptSegment.objects.bulk_create([
+                TranscriptSegment(
+                    ID_Project_id=project_id,
+                    Start=segment['start'],
+                    End=segment['end'],
+                    Text=segment['text'].strip(),
+                    Confidence=cls.confidence(segment),
+                    Words=segment.get('words') or [],
+                )
+                for segment in segments
+            ])
+            cls.store_questions(
+                processed, project_id,
+                segments=[created[index] if index is not None else None for index in question_segments],
+            )
+        return created
+
+    @classmethod
+    def reextract_questions(cls, project_id):
+        """Повторно извлекает вопросы из сохраненных сегментов, без распознавания."""
+        segments = [
+            {'text': text, 'segment': segment_id}
+            for segment_id, text in TranscriptSegment.objects
+            .filter(ID_Project=project_id).order_by('Start', 'ID').values_list('ID', 'Text')
+        ]
+        processed, question_segments = cls.extract_segment_questions(segments)
+
+        with transaction.atomic():
+            # Заменяем только найденные автоматически вопросы, на которые еще нет протоколов
+            Question.objects.filter(
+                ID_Project=project_id, ID_Segment__isnull=False, protocol__isnull=True
+            ).delete()
+            cls.store_questions(
+                processed, project_id,
+                segments=[
+                    TranscriptSegment(ID=segments[index]['segment']) if index is not None else None
+                    for index in question_segments
+                ],
+            )
+        return processed
+
+    @staticmethod
+    def confidence(segment):
+        avg_logprob = segment.get('avg_logprob')
+        if avg_logprob is None:
+            return None
+        return round(math.exp(avg_logprob), 4)
+
+    @classmethod
+    def _present(cls, pipes):
+        return [name for name in pipes if name in cls.get_nlp().pipe_names]
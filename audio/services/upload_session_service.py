@@ -0,0 +1,176 @@
+import os
+import re
+import time
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from audio.models import AudioFile, UploadSession
+from audio.services.audio_service import AudioService
+
+logger = logging.getLogger(__name__)
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadError(Exception):
+    def __init__(self, message, status_code=400, **extra):
+        super().__init__(message)
+        self.status_code = status_code
+        self.extra = extra
+
+
+class UploadSessionService:
+    """
+    Загрузка записи частями: сессия -> PUT диапазонов байт -> finalize.
+    Куски пишутся из тела запроса прямо в файл блоками, целиком в памяти
+    Django запись не держится. Оборванный кусок отправляется заново
+    с позиции received.
+    """
+
+    BLOCK_SIZE = 1024 * 1024
+
+    @staticmethod
+    def get_max_size():
+        return getattr(settings, 'AUDIO_UPLOAD_MAX_BYTES', 1024 * 1024 * 1024)
+
+    @staticmethod
+    def get_max_chunk_size():
+        return getattr(settings, 'AUDIO_UPLOAD_CHUNK_MAX_BYTES', 16 * 1024 * 1024)
+
+    @staticmethod
+    def part_path(session):
+        return default_storage.path(f"uploads/{session.id}.part")
+
+    @classmethod
+    def start(cls, project_id, filename, size):
+        AudioService.validate_audio_file(filename)
+        if size <= 0 or size > cls.get_max_size():
+            raise UploadError(f"File size must be between 1 and {cls.get_max_size()} bytes")
+
+        cls.purge_expired()
+        session = UploadSession.objects.create(
+            project_id=project_id, filename=os.path.basename(filename), size=size,
+        )
+        os.makedirs(os.path.dirname(cls.part_path(session)), exist_ok=True)
+        open(cls.part_path(session), 'wb').close()
+        return session
+
+    @staticmethod
+    def parse_content_range(header):
+        match = CONTENT_RANGE_RE.match(header or '')
+        if not match:
+            raise UploadError("Content-Range header must look like 'bytes <start>-<end>/<size>'")
+        start, end, total = (int(value) for value in match.groups())
+        if end < start:
+            raise UploadError("Invalid Content-Range")
+        return start, end, total
+
+    @classmethod
+    def write_chunk(cls, session, stream, content_range):
+        start, end, total = cls.parse_content_range(content_range)
+        length = end - start + 1
+
+        if session.status != UploadSession.Status.OPEN:
+            raise UploadError("Upload session is already finalized", 409)
+        if total != session.size or end >= session.size:
+            raise UploadError("Content-Range does not match the session size", 416)
+        if length > cls.get_max_chunk_size():
+            raise UploadError(f"Chunk is larger than {cls.get_max_chunk_size()} bytes", 413)
+        # Писать можно только продолжение уже полученного начала файла
+        if start > session.received:
+            raise UploadError("Chunk does not continue the uploaded data", 409, received=session.received)
+        if end < session.received:
+            return session, None
+
+        started = time.monotonic()
+        written = 0
+        try:
+            f = open(cls.part_path(session), 'r+b')
+        except FileNotFoundError:
+            # Сессию завершили между проверкой статуса и записью: файл уже перенесен
+            raise UploadError("Upload session is already finalized", 409)
+        with f:
+            f.seek(start)
+            while written < length:
+                block = stream.read(min(cls.BLOCK_SIZE, length - written)) if stream else b''
+                if not block:
+                    break
+                f.write(block)
+                written += len(block)
+
+        if written != length:
+            # Соединение оборвалось: засчитываем только реально полученное
+            end = start + written - 1
+
+        # Условное обновление: параллельный PUT того же места не откатит received назад
+        received = max(session.received, end + 1)
+        UploadSession.objects.filter(id=session.id, received__lt=received).update(
+            received=received, updated_at=timezone.now()
+        )
+        session.refresh_from_db()
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        throughput = round(written / elapsed / 1024 / 1024, 2)
+        logger.info(
+            f"Upload {session.id}: {written} bytes in {elapsed:.2f}s ({throughput} MB/s), "
+            f"{session.received}/{session.size}"
+        )
+        if written != length:
+            raise UploadError("Chunk body is shorter than Content-Range", 400, received=session.received)
+        return session, throughput
+
+    @classmethod
+    def complete(cls, session):
+        """Переносит собранный файл в audio/ и создает AudioFile."""
+        # Сессия блокируется до конца переноса: второй finalize той же сессии
+        # ждет и видит ее уже завершенной, а не создает второй AudioFile
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(id=session.id)
+            if session.status != UploadSession.Status.OPEN:
+                raise UploadError("Upload session is already finalized", 409)
+            if session.received != session.size:
+                raise UploadError("Upload is not complete", 409, received=session.received)
+
+            part_path = cls.part_path(session)
+            content_hash = cls.hash_file(part_path)
+
+            name = default_storage.get_available_name(f"audio/{session.filename}")
+            os.makedirs(os.path.dirname(default_storage.path(name)), exist_ok=True)
+            os.replace(part_path, default_storage.path(name))
+            audio_file = AudioFile.objects.create(audio=name, content_hash=content_hash)
+
+            session.status = UploadSession.Status.COMPLETED
+            session.audio_file = audio_file
+            session.save(update_fields=['status', 'audio_file', 'updated_at'])
+
+        elapsed = max((timezone.now() - session.created_at).total_seconds(), 1e-6)
+        throughput = round(session.size / elapsed / 1024 / 1024, 2)
+        logger.info(f"Upload {session.id} completed: {session.size} bytes in {elapsed:.1f}s ({throughput} MB/s)")
+        return audio_file, throughput
+
+    @classmethod
+    def hash_file(cls, path):
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(cls.BLOCK_SIZE), b''):
+                hasher.update(block)
+        return hasher.hexdigest()
+
+    @classmethod
+    def purge_expired(cls):
+        ttl = getattr(settings, 'AUDIO_UPLOAD_SESSION_TTL', 24 * 60 * 60)
+        expired = UploadSession.objects.filter(
+            status=UploadSession.Status.OPEN, updated_at__lt=timezone.now() - timedelta(seconds=ttl)
+        )
+        for session in expired:
+            try:
+                os.remove(cls.part_path(session))
+            except OSError:
+                pass
+            session.delete()
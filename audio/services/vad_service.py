@@ -0,0 +1,126 @@
+import logging
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.03
+
+
+class VADService:
+    """
+    Энергетический детектор речи: выкидывает тишину и паузы до распознавания.
+    Работает с 16 кГц моно float32, как и весь конвейер.
+    """
+
+    @classmethod
+    def is_enabled(cls):
+        return getattr(settings, 'AUDIO_VAD_ENABLED', False)
+
+    @classmethod
+    def get_config(cls):
+        return {
+            'threshold_db': getattr(settings, 'AUDIO_VAD_THRESHOLD_DB', 12),
+            'min_level_db': getattr(settings, 'AUDIO_VAD_MIN_LEVEL_DB', -55),
+            'padding': getattr(settings, 'AUDIO_VAD_PADDING', 0.3),
+            'min_silence': getattr(settings, 'AUDIO_VAD_MIN_SILENCE', 1.0),
+            'min_speech': getattr(settings, 'AUDIO_VAD_MIN_SPEECH', 0.25),
+        }
+
+    @classmethod
+    def detect_speech(cls, audio):
+        """Возвращает массив [[start, end], ...] в отсчетах."""
+        config = cls.get_config()
+        frame = int(FRAME_SECONDS * SAMPLE_RATE)
+        n_frames = len(audio) // frame
+        if n_frames == 0:
+            return np.empty((0, 2), dtype=np.int64)
+
+        frames = audio[:n_frames * frame].reshape(n_frames, frame)
+        level_db = 10 * np.log10(np.mean(np.square(frames), axis=1) + 1e-10)
+
+        # Порог — на threshold_db выше уровня шума (10-й перцентиль громкости)
+        noise_floor = np.percentile(level_db, 10)
+        threshold = max(noise_floor + config['threshold_db'], config['min_level_db'])
+        speech = level_db > threshold
+
+        # Расширяем речевые участки, чтобы не обрезать начала и концы слов
+        pad = int(config['padding'] / FRAME_SECONDS)
+        if pad:
+            speech = np.convolve(speech, np.ones(2 * pad + 1), mode='same') > 0
+
+        edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        if len(starts) == 0:
+            return np.empty((0, 2), dtype=np.int64)
+
+        # Склеиваем участки, разделенные короткими паузами
+        min_silence = int(config['min_silence'] / FRAME_SECONDS)
+        keep = np.concatenate(([True], starts[1:] - ends[:-1] >= min_silence))
+        starts = starts[keep]
+        ends = np.concatenate((ends[np.flatnonzero(keep)[1:] - 1], ends[-1:]))
+
+        min_speech = int(config['min_speech'] / FRAME_SECONDS)
+        long_enough = ends - starts >= min_speech
+        regions = np.stack((starts[long_enough], ends[long_enough]), axis=1) * frame
+        regions[:, 1] = np.minimum(regions[:, 1], len(audio))
+        return regions
+
+    @classmethod
+    def apply(cls, audio):
+        """Возвращает (только речь, участки речи, статистика отброшенного)."""
+        regions = cls.detect_speech(audio)
+        speech = (
+            np.concatenate([audio[start:end] for start, end in regions])
+            if len(regions) else np.empty(0, dtype=audio.dtype)
+        )
+
+        total_seconds = len(audio) / SAMPLE_RATE
+        speech_seconds = len(speech) / SAMPLE_RATE
+        stats = {
+            'total_seconds': round(total_seconds, 2),
+            'speech_seconds': round(speech_seconds, 2),
+            'dropped_seconds': round(total_seconds - speech_seconds, 2),
+            'dropped_ratio': round(1 - speech_seconds / total_seconds, 3) if total_seconds else 0.0,
+            'regions': len(regions),
+        }
+        logger.info(
+            f"VAD kept {speech_seconds:.1f}s of {total_seconds:.1f}s "
+            f"in {len(regions)} regions (dropped {stats['dropped_ratio']:.0%})"
+        )
+        return speech, regions, stats
+
+    @staticmethod
+    def restore_timestamps(segments, regions):
+        """Переводит время сегментов из "сжатой" записи обратно во время исходной."""
+        if not segments or not len(regions):
+            return segments
+
+        lengths = (regions[:, 1] - regions[:, 0]) / SAMPLE_RATE
+        compressed_starts = np.concatenate(([0.0], np.cumsum(lengths)[:-1]))
+        original_starts = regions[:, 0] / SAMPLE_RATE
+        last = len(regions) - 1
+
+        def restore(times, side):
+            times = np.asarray(times, dtype=np.float64)
+            index = np.clip(np.searchsorted(compressed_starts, times, side=side) - 1, 0, last)
+            return original_starts[index] + (times - compressed_starts[index])
+
+        # Конец сегмента, попавший ровно на стык, относится к предыдущему участку
+        starts = restore([segment['start'] for segment in segments], 'right')
+        ends = restore([segment['end'] for segment in segments], 'left')
+        for segment, start, end in zip(segments, starts, ends):
+            segment['start'] = round(float(start), 3)
+            segment['end'] = round(float(end), 3)
+
+        words = [word for segment in segments for word in segment.get('words') or []]
+        if words:
+            starts = restore([word['start'] for word in words], 'right')
+            ends = restore([word['end'] for word in words], 'left')
+            for word, start, end in zip(words, starts, ends):
+                word['start'] = round(float(start), 3)
+                word['end'] = round(float(end), 3)
+        return segments
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save
+
+from audio.models import (
+    Commission,
+    CommissionComposition,
+    CommissionMember,
+    DefenseSchedule,
+    Project,
+    Protocol,
+    Question,
+    SecretarySpecialization,
+    Specialization,
+    Student,
+)
+from audio.services.table_version_service import TableVersionService
+
+# Таблицы, по версиям которых строятся ETag и ключи кэша ответов (version_models).
+# Массовые update()/bulk_create() сигналов не шлют — после них нужно вызывать
+# TableVersionService.bump() явно
+VERSIONED_MODELS = [
+    Commission,
+    CommissionComposition,
+    CommissionMember,
+    DefenseSchedule,
+    Project,
+    Protocol,
+    Question,
+    SecretarySpecialization,
+    Specialization,
+    Student,
+]
+
+
+def bump_table_version(sender, **kwargs):
+    TableVersionService.bump(sender)
+
+
+def connect():
+    for model in VERSIONED_MODELS:
+        post_save.connect(bump_table_version, sender=model, dispatch_uid=f"table_version_save_{model.__name__}")
+        post_delete.connect(bump_table_version, sender=model, dispatch_uid=f"table_version_delete_{model.__name__}")
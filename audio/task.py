@@ -1,41 +1,214 @@
 import os
 from django.core.files.storage import default_storage
-from celery import shared_task
-from audio.services.audio_service import AudioService
+from celery import chain, shared_task, states
+from celery.utils import uuid
+from audio.services.audio_job_service import AudioJobService
+from audio.services.audio_service import AudioService, SAMPLE_RATE
+from audio.services.checkpoint_service import PipelineCheckpoint
+from audio.services.progress_service import JobProgressService
+from audio.services.question_dedup_service import QuestionDeduplicationService
 from audio.services.transcription_service import TranscriptionService
+from audio.services.transcript_cache_service import TranscriptCacheService
+from audio.services.question_generation_service import QuestionGenerationService
+from django.conf import settings
+from django.db import transaction
 from audio.models import AudioFile
 import logging
 
 
 logger = logging.getLogger(__name__)
 
-@shared_task(bind=True, max_retries=3)
-def process_audio_task(self, audio_file_id, project_id):
-    audio_file = None
-    audio_file_path = None
+# Обработка записи разбита на этапы, каждый идет в свою очередь
+# (маршруты — CELERY_TASK_ROUTES в settings.py):
+# decode -> asr -> nlp -> db, генерация вопросов LLM — в очереди llm
+
+
+def start_audio_processing(audio_file_id, project_id, job_id=None):
+    # У обработки свой id, отличный от id задач цепочки: под ним хранится
+    # общий прогресс, который не затирается результатами отдельных этапов
+    job_id = job_id or uuid()
+    JobProgressService.report(job_id, 'queued', state=states.PENDING, project_id=project_id)
+    chain(
+        decode_audio_task.s(audio_file_id, project_id, job_id),
+        transcribe_audio_task.s(),
+        extract_questions_task.s(),
+        save_questions_task.s(),
+    ).apply_async()
+    return job_id
+
+
+def cleanup_job(payload):
+    # Исходная запись и контрольные точки удаляются только когда обработка
+    # завершена окончательно: успешно или после исчерпания повторов
+    PipelineCheckpoint(payload['job_id']).clear()
+
+    audio_file = AudioFile.objects.filter(id=payload['audio_file_id']).first()
+    if audio_file:
+        audio_file_path = default_storage.path(audio_file.audio.name)
+        if os.path.exists(audio_file_path):
+            os.remove(audio_file_path)
+        audio_file.delete()
+
+
+def retry_or_cleanup(task, exc, payload):
+    logger.error(f"Audio processing failed at {task.name}: {str(exc)}")
+    if task.request.retries >= task.max_retries:
+        cleanup_job(payload)
+        JobProgressService.report_failure(payload['job_id'], exc)
+        AudioJobService.fail(payload['job_id'], exc)
+    raise task.retry(exc=exc, countdown=60)
+
+
+# Короткие этапы подтверждаются после выполнения и при гибели воркера доставляются
+# заново. Распознавание (asr) и генерация LLM могут идти дольше consumer_timeout
+# RabbitMQ (30 минут), поэтому подтверждаются при получении (см. README)
+LATE_ACK = {'acks_late': True, 'reject_on_worker_lost': True}
+
+
+# Каждый этап сначала проверяет свою контрольную точку: повтор задачи или
+# повторная доставка после падения воркера не пересчитывает готовое
+
+
+@shared_task(bind=True, max_retries=3, **LATE_ACK)
+def decode_audio_task(self, audio_file_id, project_id, job_id):
+    payload = {'audio_file_id': audio_file_id, 'project_id': project_id, 'job_id': job_id}
     try:
+        checkpoint = PipelineCheckpoint(job_id)
         audio_file = AudioFile.objects.get(id=audio_file_id)
-        audio_file_path = default_storage.path(audio_file.audio.name)
+        payload['content_hash'] = audio_file.content_hash
 
-        if not audio_file.audio.name.endswith('.wav'):
-            converted_path = f"{audio_file_path}.wav"
-            AudioService.convert_to_wav(audio_file_path, converted_path)
-            audio_file_path = converted_path
+        if checkpoint.has_array('decoded'):
+            return payload
 
-        transcribed_text = AudioService.transcribe_audio(audio_file_path)
-        questions = TranscriptionService.extract_questions(transcribed_text)
-        TranscriptionService.save_questions(questions, project_id)
+        AudioJobService.heartbeat(job_id)
+        # Декодируем прямо в память, без промежуточного WAV на диске
+        audio = AudioService.decode_audio(default_storage.path(audio_file.audio.name))
+        checkpoint.save_array('decoded', audio)
 
-        return {"status": "success", "transcribed_text": transcribed_text}
+        JobProgressService.report(
+            job_id, 'decoded', project_id=project_id, duration=round(len(audio) / SAMPLE_RATE, 1),
+        )
+        return payload
 
     except Exception as exc:
-        logger.error(f"Audio processing failed: {str(exc)}")
-        if audio_file:
-            audio_file.delete()
-        raise self.retry(exc=exc, countdown=60)
+        retry_or_cleanup(self, exc, payload)
 
-    finally:
-        if audio_file_path and os.path.exists(audio_file_path):
-            os.remove(audio_file_path)
-        if audio_file:
-            audio_file.delete()
\ No newline at end of file
+
+@shared_task(bind=True, max_retries=3)
+def transcribe_audio_task(self, payload):
+    try:
+        checkpoint = PipelineCheckpoint(payload['job_id'])
+        transcription = checkpoint.load_json('transcript')
+
+        if transcription is None:
+            AudioJobService.heartbeat(payload['job_id'])
+
+            def progress(done, total):
+                AudioJobService.heartbeat(payload['job_id'])
+                JobProgressService.report_transcribing(
+                    payload['job_id'], done, total, project_id=payload['project_id'],
+                )
+
+            transcription = AudioService.transcribe(
+                checkpoint.load_array('decoded'), progress=progress, checkpoint=checkpoint,
+            )
+            transcription = {
+                'text': transcription['text'],
+                'segments': transcription['segments'],
+                'vad': transcription.get('vad'),
+            }
+            checkpoint.save_json('transcript', transcription)
+
+        JobProgressService.report(payload['job_id'], 'transcribed', project_id=payload['project_id'])
+        return {**payload, 'text': transcription['text'], 'vad': transcription.get('vad')}
+
+    except Exception as exc:
+        retry_or_cleanup(self, exc, payload)
+
+
+@shared_task(bind=True, max_retries=3, **LATE_ACK)
+def extract_questions_task(self, payload):
+    try:
+        checkpoint = PipelineCheckpoint(payload['job_id'])
+        extracted = checkpoint.load_json('questions')
+
+        if extracted is None:
+            AudioJobService.heartbeat(payload['job_id'])
+            # Вопросы ищем по сегментам, чтобы знать, в каком месте записи они прозвучали
+            segments = checkpoint.load_json('transcript')['segments']
+            questions, question_segments = TranscriptionService.extract_segment_questions(segments)
+            extracted = {'questions': questions, 'question_segments': question_segments}
+            checkpoint.save_json('questions', extracted)
+
+        JobProgressService.report(
+            payload['job_id'], 'questions_extracted',
+            project_id=payload['project_id'], questions=len(extracted['questions']),
+        )
+        return {**payload, **extracted}
+
+    except Exception as exc:
+        retry_or_cleanup(self, exc, payload)
+
+
+@shared_task(bind=True, max_retries=3, **LATE_ACK)
+def save_questions_task(self, payload):
+    try:
+        checkpoint = PipelineCheckpoint(payload['job_id'])
+
+        # Вопросы записываются в одной транзакции с отметкой обработки выполненной:
+        # повтор после гибели воркера в любой момент не запишет их второй раз
+        with transaction.atomic():
+            first_save = AudioJobService.mark_done(payload['job_id'], len(payload['questions']))
+            if first_save is None:
+                first_save = not checkpoint.has_json('saved')
+            if first_save:
+                segments = checkpoint.load_json('transcript')['segments']
+                TranscriptionService.store_transcript(
+                    segments, payload['questions'], payload['question_segments'], payload['project_id'],
+                )
+                TranscriptCacheService.store(
+                    payload.get('content_hash'), payload['text'], payload['questions'],
+                    segments=segments, question_segments=payload['question_segments'],
+                )
+                if getattr(settings, 'LLM_QUESTIONS_ENABLED', False):
+                    QuestionGenerationService.submit(payload['project_id'], payload['text'])
+        checkpoint.save_json('saved', {'questions': len(payload['questions'])})
+        # После кэша: ожидающие эту запись обработки получают вопросы из него
+        if payload.get('content_hash'):
+            AudioJobService.release_waiting(payload['content_hash'])
+        cleanup_job(payload)
+
+        JobProgressService.report(
+            payload['job_id'], 'saved', state=states.SUCCESS,
+            project_id=payload['project_id'], questions=len(payload['questions']), vad=payload.get('vad'),
+        )
+        return {
+            "status": "success",
+            "transcribed_text": payload['text'],
+            "vad": payload.get('vad'),
+        }
+
+    except Exception as exc:
+        retry_or_cleanup(self, exc, payload)
+
+
+@shared_task
+def generate_questions_task():
+    # Выполняется только воркером очереди llm, где модель уже загружена
+    return {"processed": QuestionGenerationService.run_pending()}
+
+
+@shared_task(**LATE_ACK)
+def save_live_questions_task(project_id, questions):
+    # Вопросы расшифровки во время защиты (WebSocket): лемматизация в очереди nlp
+    if QuestionDeduplicationService.is_enabled():
+        questions = QuestionDeduplicationService.deduplicate(questions)
+    TranscriptionService.save_questions(questions, project_id)
+    return {"project_id": project_id, "questions": len(questions)}
+
+
+@shared_task(**LATE_ACK)
+def reextract_questions_task(project_id):
+    # Вопросы из уже сохраненных сегментов: распознавание не повторяется
+    questions = TranscriptionService.reextract_questions(project_id)
+    return {"project_id": project_id, "questions": len(questions)}
@@ -1,3 +1,759 @@
-from django.test import TestCase
+import hashlib
+import queue
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from audio.models import (
+    AudioFile,
+    AudioJob,
+    Commission,
+    DefenseSchedule,
+    Group,
+    Institute,
+    Project,
+    Protocol,
+    Question,
+    QuestionGenerationJob,
+    Specialization,
+    Student,
+    TranscriptSegment,
+)
+from audio.services.LLMProcessor_service import LLMProcessor
+from audio.services.audio_service import SAMPLE_RATE, AudioService
+from audio.services.checkpoint_service import PipelineCheckpoint
+from audio.services.audio_job_service import AudioJobService
+from audio.services.question_dedup_service import QuestionDeduplicationService
+from audio.services.question_generation_service import QuestionGenerationService
+from audio.services.response_cache_service import ResponseCacheService
+from audio.services.transcript_cache_service import TranscriptCacheService
+from audio.services.transcription_service import TranscriptionService
+from audio.task import save_questions_task
+
+
+class StudentDataTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        institute = Institute.objects.create(Name="ИИТ")
+        cls.group = Group.objects.create(Name="ИВТ-41", ID_Institute=institute)
+        cls.specialization = Specialization.objects.create(Name="Программная инженерия", Qualification="Бакалавр")
+        cls.project = Project.objects.create(Title="Проект", Supervisor="Руководитель", Status="Готов")
+        cls.question = Question.objects.create(Text="вопрос", ID_Project=cls.project)
+        commission = Commission.objects.create(Name="Комиссия 1")
+        cls.schedule = DefenseSchedule.objects.create(
+            DateTime=timezone.make_aware(datetime(2025, 6, 20, 10, 0)), ID_Commission=commission
+        )
+
+    def create_students(self, count):
+        students = []
+        for index in range(count):
+            student = Student.objects.create(
+                Surname=f"Иванов{index}", Name="Иван", Patronymic="Иванович",
+                ID_Group=self.group, ID_Specialization=self.specialization, ID_Project=self.project,
+            )
+            for grade in ("3", "5"):
+                Protocol.objects.create(
+                    Year=2025, Grade=grade, ID_Question=self.question, ID_Student=student,
+                    ID_DefenseSchedule=self.schedule, Number=str(index), Status=True,
+                )
+            students.append(student)
+        return students
+
+
+class StudentGradeQueriesTest(StudentDataTestCase):
+
+    def get_students(self):
+        return APIClient().get(reverse('student-list'), {'ID_Project': self.project.ID})
+
+    def test_latest_grade(self):
+        self.create_students(2)
+        response = self.get_students()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([student['grade'] for student in response.json()], ["5", "5"])
+
+    def test_query_count_does_not_depend_on_student_count(self):
+        self.create_students(1)
+        with self.assertNumQueries(2):  # проверка ID_Project в фильтре + список студентов
+            self.get_students()
+
+        self.create_students(20)
+        with self.assertNumQueries(2):
+            response = self.get_students()
+        self.assertEqual(len(response.json()), 21)
+
+
+class ProtocolQueriesTest(StudentDataTestCase):
+    def test_query_count_does_not_depend_on_protocol_count(self):
+        # QueryPlanMixin выводит select_related/prefetch_related из вложенного ProtocolSerializer
+        self.create_students(1)
+        with self.assertNumQueries(3):
+            response = APIClient().get(reverse('protocol-list'))
+        self.assertEqual(len(response.json()), 2)
+
+        self.create_students(10)
+        with self.assertNumQueries(3):
+            response = APIClient().get(reverse('protocol-list'))
+        self.assertEqual(len(response.json()), 22)
+
+
+class ListSelectionTest(StudentDataTestCase):
+    def get_protocols(self, url=None, **params):
+        response = APIClient().get(url or reverse('protocol-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_fields_keep_only_listed_paths(self):
+        self.create_students(2)
+        with self.assertNumQueries(1):  # ID_DefenseSchedule и вложения студента не нужны
+            rows = self.get_protocols(fields="ID,ID_Student.Surname")
+        self.assertEqual(len(rows), 4)
+        for row in rows:
+            self.assertEqual(set(row), {'ID', 'ID_Student'})
+            self.assertEqual(set(row['ID_Student']), {'Surname'})
+
+    def test_expand_keeps_other_relations_as_ids(self):
+        student, = self.create_students(1)
+        rows = self.get_protocols(expand="ID_Student")
+        self.assertEqual(rows[0]['ID_Student']['Surname'], student.Surname)
+        self.assertEqual(rows[0]['ID_Student']['ID_Group'], self.group.ID)
+        self.assertEqual(rows[0]['ID_DefenseSchedule'], self.schedule.ID)
+
+    def test_cursor_pages_follow_next_link(self):
+        self.create_students(6)
+        ids = []
+        page = self.get_protocols(page_size=5)
+        while True:
+            self.assertLessEqual(len(page['results']), 5)
+            ids += [row['ID'] for row in page['results']]
+            if not page['next']:
+                break
+            page = self.get_protocols(page['next'])
+        self.assertEqual(ids, sorted(Protocol.objects.values_list('ID', flat=True)))
+        self.assertEqual(len(ids), 12)
+
+    def test_list_without_page_size_is_not_paginated(self):
+        self.create_students(6)
+        rows = self.get_protocols()
+        self.assertIsInstance(rows, list)
+        self.assertEqual(len(rows), 12)
+
+
+# Кэши в памяти процесса: ответы и счетчики не переживают тест и не попадают в BASE_DIR/cache
+LOCMEM_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f"test-{alias}"}
+    for alias in ('default', 'responses', 'stats')
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConditionalGetTest(StudentDataTestCase):
+    def get(self, url, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return APIClient().get(url, **headers)
+
+    def test_not_modified_after_one_query(self):
+        url = reverse('commission-list')
+        etag = self.get(url)['ETag']
+        with self.assertNumQueries(1):  # только версии таблиц
+            response = self.get(url, etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_save_changes_etag(self):
+        url = reverse('commission-list')
+        etag = self.get(url)['ETag']
+        commission = Commission.objects.get()
+        commission.Name = "Комиссия 2"
+        commission.save()
+
+        response = self.get(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['Name'], "Комиссия 2")
+
+    def test_queryset_update_changes_etag(self):
+        # project_time_start меняет протоколы через queryset.update(), без сигналов post_save
+        self.create_students(1)
+        url = f"{reverse('defense-list')}?specialization_id={self.specialization.ID}"
+        etag = self.get(url)['ETag']
+
+        response = APIClient().patch(reverse('project-project-time-start'), {
+            'ID_Project': self.project.ID, 'DefenseStartTime': "10:30",
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.get(url, etag).status_code, 200)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ResponseCacheTest(StudentDataTestCase):
+    def setUp(self):
+        for alias in LOCMEM_CACHES:
+            caches[alias].clear()
+
+    def test_hit_returns_same_content(self):
+        url = reverse('project-list')
+        first = APIClient().get(url)
+        with self.assertNumQueries(1):  # только версии таблиц
+            second = APIClient().get(url)
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(ResponseCacheService.stats()['ProjectViewSet'], {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_save_invalidates_through_table_version(self):
+        url = reverse('project-list')
+        APIClient().get(url)
+        self.project.Title = "Новый проект"
+        self.project.save()
+
+        response = APIClient().get(url)
+        self.assertEqual(response.json()[0]['Title'], "Новый проект")
+        self.assertEqual(ResponseCacheService.stats()['ProjectViewSet']['misses'], 2)
+
+    def test_key_includes_query_params_and_user(self):
+        self.create_students(1)
+        url = reverse('project-list')
+        self.assertEqual(len(APIClient().get(url).json()), 1)
+        # Фильтр по другой защите не должен получить ответ без фильтра
+        self.assertEqual(APIClient().get(url, {'defense_schedule_id': self.schedule.ID + 1}).json(), [])
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('secretary'))
+        client.get(url)
+        self.assertEqual(ResponseCacheService.stats()['ProjectViewSet'], {'hits': 0, 'misses': 3, 'hit_ratio': 0.0})
+
+    def test_reset_stats(self):
+        APIClient().get(reverse('project-list'))
+        ResponseCacheService.reset_stats()
+        self.assertEqual(ResponseCacheService.stats(), {})
+
+
+# DISTINCT ON в GradeService.latest_protocols есть только в PostgreSQL
+@skipUnless(connection.vendor == 'postgresql', "нужен PostgreSQL")
+class BulkGradeUpdateTest(StudentDataTestCase):
+    def grades(self, student):
+        return list(Protocol.objects.filter(ID_Student=student).order_by('ID').values_list('Grade', flat=True))
+
+    def bulk_update(self, rows):
+        return APIClient().patch(reverse('student-bulk-update-grade'), rows, format='json')
+
+    def test_grades_go_to_latest_protocols(self):
+        first, second = self.create_students(2)
+        response = self.bulk_update([
+            {'ID_Student': first.ID, 'Grade': "4"},
+            {'ID_Student': second.ID, 'Grade': "3"},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['status'] for row in response.json()['results']], ["updated", "updated"])
+        self.assertEqual(self.grades(first), ["3", "4"])
+        self.assertEqual(self.grades(second), ["3", "3"])
+
+    def test_invalid_row_rejects_whole_batch(self):
+        first, second = self.create_students(2)
+        response = self.bulk_update([
+            {'ID_Student': first.ID, 'Grade': "4"},
+            {'ID_Student': 999999, 'Grade': "4"},
+            {'ID_Student': second.ID, 'Grade': "4"},
+            {'ID_Student': second.ID, 'Grade': "2"},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [row['status'] for row in response.json()['results']], ["ok", "error", "ok", "error"]
+        )
+        self.assertEqual(self.grades(first), ["3", "5"])
+        self.assertEqual(self.grades(second), ["3", "5"])
+
+    def test_single_update_with_several_protocols(self):
+        student, = self.create_students(1)
+        response = APIClient().patch(
+            reverse('student-update-grade'), {'ID_Student': student.ID, 'Grade': "4"}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.grades(student), ["3", "4"])
+
+
+class ProtocolFilterTest(StudentDataTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for surname, name, patronymic in [
+            ("Петров", "Сергей", "Иванович"),
+            ("Сидорова", "Анна", "Петровна"),
+            ("Кузнецов", "Иван", "Андреевич"),
+        ]:
+            student = Student.objects.create(
+                Surname=surname, Name=name, Patronymic=patronymic,
+                ID_Group=cls.group, ID_Specialization=cls.specialization, ID_Project=cls.project,
+            )
+            Protocol.objects.create(
+                Year=2025, Grade="5", ID_Question=cls.question, ID_Student=student,
+                ID_DefenseSchedule=cls.schedule, Number=surname, Status=True,
+            )
+
+    def surnames(self, **params):
+        response = APIClient().get(reverse('protocol-list'), params)
+        self.assertEqual(response.status_code, 200)
+        ids = [row['ID'] for row in response.json()]
+        return sorted(Student.objects.filter(protocol__ID__in=ids).values_list('Surname', flat=True))
+
+    def test_student_fio_matches_any_word_anywhere(self):
+        # Любое из слов в любой части фамилии, имени или отчества
+        self.assertEqual(self.surnames(student_fio="петров"), ["Петров", "Сидорова"])
+        self.assertEqual(self.surnames(student_fio="анна кузнецов"), ["Кузнецов", "Сидорова"])
+        self.assertEqual(self.surnames(student_fio="ров"), ["Петров", "Сидорова"])
+
+    def test_search_matches_all_word_prefixes(self):
+        self.assertEqual(self.surnames(search="петров"), ["Петров", "Сидорова"])
+        self.assertEqual(self.surnames(search="иван серг"), ["Петров"])
+        self.assertEqual(self.surnames(search="анна кузнецов"), [])
+        self.assertEqual(self.surnames(search="ров"), [])
+
+
+class AudioUploadTest(TestCase):
+    CONTENT = b"recording" * 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.project = Project.objects.create(Title="Проект", Supervisor="Руководитель", Status="Новый")
+        cls.other_project = Project.objects.create(Title="Другой проект", Supervisor="Руководитель", Status="Новый")
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        patcher = mock.patch(
+            'audio.services.audio_views.start_audio_processing',
+            side_effect=lambda audio_file_id, project_id, job_id: job_id,
+        )
+        self.start_processing = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self, content, name="Вариант 4.m4a", project=None):
+        return APIClient().post(reverse('upload-audio'), {
+            'audio': SimpleUploadedFile(name, content),
+            'project_id': (project or self.project).ID,
+        }, format='multipart')
+
+    def store_cache(self):
+        TranscriptCacheService.store(
+            hashlib.sha256(self.CONTENT).hexdigest(), "Что такое граф? Как его обойти?",
+            ["что такое граф", "как его обойти"],
+            segments=[
+                {'start': 0.0, 'end': 2.0, 'text': " Что такое граф?", 'avg_logprob': -0.1, 'words': []},
+                {'start': 2.0, 'end': 4.0, 'text': " Как его обойти?", 'avg_logprob': -0.2, 'words': []},
+            ],
+            question_segments=[0, 1],
+        )
+
+    def test_small_file_is_hashed_by_memory_handler(self):
+        # Файл меньше FILE_UPLOAD_MAX_MEMORY_SIZE забирает MemoryFileUploadHandler
+        content = b"small recording" * 1000
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(AudioFile.objects.get().content_hash, hashlib.sha256(content).hexdigest())
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_large_file_is_hashed_by_temporary_file_handler(self):
+        content = b"large recording" * 1000
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(AudioFile.objects.get().content_hash, hashlib.sha256(content).hexdigest())
+
+    def test_cache_hit_is_stored_once_per_project(self):
+        self.store_cache()
+        first = self.upload(self.CONTENT)
+        second = self.upload(self.CONTENT)
+
+        self.assertEqual((first.status_code, second.status_code), (200, 200))
+        self.assertEqual(first.json()['job_id'], second.json()['job_id'])
+        self.assertEqual(Question.objects.filter(ID_Project=self.project).count(), 2)
+        self.assertEqual(TranscriptSegment.objects.filter(ID_Project=self.project).count(), 2)
+        self.assertEqual(AudioFile.objects.count(), 0)
+        self.start_processing.assert_not_called()
+
+    def test_reupload_while_processing_returns_running_job(self):
+        first = self.upload(self.CONTENT)
+        second = self.upload(self.CONTENT)
+
+        self.assertEqual((first.status_code, second.status_code), (202, 202))
+        self.assertEqual(first.json()['job_id'], second.json()['job_id'])
+        self.assertEqual(self.start_processing.call_count, 1)
+        self.assertEqual(AudioFile.objects.count(), 1)
+
+    def test_upload_to_other_project_waits_for_running_job(self):
+        job_id = self.upload(self.CONTENT).json()['job_id']
+        response = self.upload(self.CONTENT, project=self.other_project)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.start_processing.call_count, 1)
+        waiting = AudioJob.objects.get(job_id=response.json()['job_id'])
+        self.assertEqual(waiting.status, AudioJob.Status.WAITING)
+
+        # Первая обработка сохранила кэш и завершилась: ожидающая получает вопросы из него
+        self.store_cache()
+        AudioJobService.mark_done(job_id, 2)
+        AudioJobService.release_waiting(hashlib.sha256(self.CONTENT).hexdigest())
+
+        waiting.refresh_from_db()
+        self.assertEqual(waiting.status, AudioJob.Status.DONE)
+        self.assertEqual(Question.objects.filter(ID_Project=self.other_project).count(), 2)
+
+    def test_orphaned_leader_expires(self):
+        # Воркер распознавания погиб: обработка осталась RUNNING без отметок этапов
+        leader_id = self.upload(self.CONTENT).json()['job_id']
+        waiting_id = self.upload(self.CONTENT, project=self.other_project).json()['job_id']
+        AudioJob.objects.filter(job_id=leader_id).update(
+            updated_at=timezone.now() - timedelta(seconds=AudioJobService.get_timeout() + 1)
+        )
+
+        response = self.upload(self.CONTENT)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertNotEqual(response.json()['job_id'], leader_id)
+        self.assertEqual(self.start_processing.call_count, 2)
+        self.assertEqual(AudioJob.objects.get(job_id=leader_id).status, AudioJob.Status.FAILED)
+        self.assertEqual(AudioJob.objects.get(job_id=waiting_id).status, AudioJob.Status.FAILED)
+        self.assertEqual(AudioJob.objects.get(job_id=response.json()['job_id']).status, AudioJob.Status.RUNNING)
+
+        # Брошенная обработка все же дошла до записи: вопросы не сохраняются второй раз
+        self.assertFalse(AudioJobService.mark_done(leader_id, 2))
+
+    def test_save_task_retry_after_commit_does_not_duplicate(self):
+        # Воркер погиб после записи вопросов, но до метки saved в контрольной точке: задача повторяется
+        job_id = self.upload(self.CONTENT).json()['job_id']
+        segments = [{'start': 0.0, 'end': 2.0, 'text': " Что такое граф?", 'avg_logprob': -0.1, 'words': []}]
+        PipelineCheckpoint(job_id).save_json('transcript', {'text': "Что такое граф?", 'segments': segments})
+        payload = {
+            'audio_file_id': AudioFile.objects.get().id, 'project_id': self.project.ID, 'job_id': job_id,
+            'content_hash': hashlib.sha256(self.CONTENT).hexdigest(), 'text': "Что такое граф?",
+            'questions': ["что такое граф"], 'question_segments': [0],
+        }
+        with mock.patch('audio.task.cleanup_job'), mock.patch.object(PipelineCheckpoint, 'save_json'):
+            save_questions_task.apply(args=[payload])
+        save_questions_task.apply(args=[payload])
+
+        self.assertEqual(Question.objects.filter(ID_Project=self.project).count(), 1)
+        self.assertEqual(TranscriptSegment.objects.filter(ID_Project=self.project).count(), 1)
+        self.assertEqual(AudioJob.objects.get(job_id=job_id).status, AudioJob.Status.DONE)
+
+
+class UploadSessionTest(TestCase):
+    CONTENT = bytes(range(100))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.project = Project.objects.create(Title="Проект", Supervisor="Руководитель", Status="Новый")
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        patcher = mock.patch(
+            'audio.services.audio_views.start_audio_processing',
+            side_effect=lambda audio_file_id, project_id, job_id: job_id,
+        )
+        self.start_processing = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = APIClient()
+        self.session_id = self.client.post(reverse('upload-session-start'), {
+            'project_id': self.project.ID, 'filename': "Вариант 4.m4a", 'size': len(self.CONTENT),
+        }, format='json').json()['session_id']
+
+    def put(self, start, end, total=None):
+        return self.client.put(
+            reverse('upload-session-detail', args=[self.session_id]), self.CONTENT[start:end + 1],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f"bytes {start}-{end}/{total or len(self.CONTENT)}",
+        )
+
+    def finalize(self):
+        return self.client.post(reverse('upload-session-finalize', args=[self.session_id]))
+
+    def test_out_of_order_chunk_is_rejected(self):
+        self.assertEqual(self.put(0, 9).status_code, 200)
+        response = self.put(20, 29)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['received'], 10)
+
+    def test_overlapping_chunks_continue_from_received(self):
+        self.assertEqual(self.put(0, 49).json()['received'], 50)
+        self.assertEqual(self.put(40, 79).json()['received'], 80)
+        # Повтор уже полученного куска ничего не меняет
+        self.assertEqual(self.put(0, 29).json()['received'], 80)
+        self.assertEqual(self.put(80, 99).json()['received'], 100)
+
+        self.assertEqual(self.finalize().status_code, 202)
+        with AudioFile.objects.get().audio.open('rb') as f:
+            self.assertEqual(f.read(), self.CONTENT)
+
+    @override_settings(AUDIO_UPLOAD_CHUNK_MAX_BYTES=50)
+    def test_oversized_ranges_are_rejected(self):
+        self.assertEqual(self.put(90, 100).status_code, 416)
+        self.assertEqual(self.put(0, 9, total=200).status_code, 416)
+        self.assertEqual(self.put(0, 50).status_code, 413)
+        self.assertEqual(self.put(0, 49).json()['received'], 50)
+
+    def test_second_finalize_is_rejected(self):
+        self.put(0, 99)
+        first = self.finalize()
+        second = self.finalize()
+
+        self.assertEqual((first.status_code, second.status_code), (202, 409))
+        self.assertEqual(AudioFile.objects.count(), 1)
+        self.assertEqual(self.start_processing.call_count, 1)
+        # Кусок после завершения тоже отклоняется
+        self.assertEqual(self.put(0, 9).status_code, 409)
+
+
+class InlinePool:
+    """Пул, выполняющий куски сразу в этом процессе."""
+
+    def apply_async(self, func, args, callback, error_callback):
+        try:
+            result = func(*args)
+        except Exception as e:
+            error_callback(e)
+        else:
+            callback(result)
+
+
+def fake_transcribe_chunk(audio, language):
+    # Сегмент на каждые 10 секунд куска, со временем от начала куска
+    seconds = len(audio) / SAMPLE_RATE
+    return [
+        {
+            'start': float(start), 'end': min(start + 10.0, seconds), 'text': f" {start}",
+            'words': [{'word': f" {start}", 'start': float(start), 'end': float(start) + 1}],
+        }
+        for start in range(0, int(seconds), 10)
+    ]
+
+
+class ChunkedTranscriptionTest(SimpleTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        patcher = mock.patch.object(AudioService, 'get_pool', return_value=InlinePool())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.audio = np.random.default_rng(0).normal(0, 0.1, 700 * SAMPLE_RATE).astype(np.float32)
+
+    def test_segments_are_stitched_on_absolute_time(self):
+        with mock.patch('audio.services.audio_service._transcribe_chunk', fake_transcribe_chunk):
+            result = AudioService.transcribe_chunked(self.audio)
+
+        # Из зоны перекрытия сегмент берется только у одного куска: середины не повторяются
+        middles = [(segment['start'] + segment['end']) / 2 for segment in result['segments']]
+        self.assertTrue(all(earlier < later for earlier, later in zip(middles, middles[1:])))
+        self.assertEqual(result['segments'][0]['start'], 0)
+        self.assertGreater(result['segments'][-1]['end'], 690)
+        for segment in result['segments']:
+            self.assertEqual(segment['words'][0]['start'], segment['start'])
+
+    def test_chunks_are_restored_from_checkpoint(self):
+        checkpoint = PipelineCheckpoint('chunked')
+        with mock.patch('audio.services.audio_service._transcribe_chunk', fake_transcribe_chunk):
+            first = AudioService.transcribe_chunked(self.audio, checkpoint=checkpoint)
+        with mock.patch('audio.services.audio_service._transcribe_chunk', side_effect=RuntimeError) as transcribe:
+            second = AudioService.transcribe_chunked(self.audio, checkpoint=checkpoint)
+
+        transcribe.assert_not_called()
+        self.assertEqual(first['text'], second['text'])
+
+
+class FakeLlama:
+    """Контекст llama.cpp, который отдает заранее заданный ответ по три символа."""
+
+    def __init__(self, output):
+        self.output = output
+
+    def __call__(self, prompt, stream=False, **params):
+        return ({'choices': [{'text': self.output[i:i + 3]}]} for i in range(0, len(self.output), 3))
+
+    def tokenize(self, data, add_bos=False):
+        return data.split()
+
+
+class FakeWindowLlama(FakeLlama):
+    """Отдает свой ответ для каждого окна расшифровки."""
+
+    def __init__(self, outputs):
+        self.outputs = outputs
+
+    def __call__(self, prompt, stream=False, **params):
+        self.output = next(output for window, output in self.outputs.items() if window in prompt)
+        return super().__call__(prompt, stream, **params)
+
+
+class LLMAnswerParsingTest(SimpleTestCase):
+    REASONING = "<think>\nСначала прочитаю текст.\n1. Сначала прочитаю текст\n2. Потом выделю вопросы\n</think>\n\n"
+    ANSWER = "1. Что такое граф?\n2. Как работает поиск в ширину?\n"
+
+    def make_processor(self, output):
+        processor = LLMProcessor.__new__(LLMProcessor)
+        processor.config = {**LLMProcessor.get_config(), 'parallel': 1}
+        processor.model = FakeLlama(output)
+        processor._contexts = queue.Queue()
+        processor._contexts.put(processor.model)
+        return processor
+
+    def test_reasoning_lines_are_not_questions(self):
+        self.assertEqual(
+            LLMProcessor.clean_output(self.REASONING + self.ANSWER),
+            ["Что такое граф?", "Как работает поиск в ширину?"],
+        )
+
+    def test_reasoning_without_opening_tag(self):
+        output = self.REASONING.replace("<think>", "") + self.ANSWER
+        self.assertEqual(LLMProcessor.clean_output(output), ["Что такое граф?", "Как работает поиск в ширину?"])
+
+    def test_answer_without_reasoning(self):
+        self.assertEqual(LLMProcessor.clean_output(self.ANSWER), ["Что такое граф?", "Как работает поиск в ширину?"])
+
+    def test_unfinished_reasoning_gives_no_questions(self):
+        self.assertEqual(LLMProcessor.clean_output(self.REASONING.replace("</think>", "")), [])
+
+    def test_streamed_reasoning_does_not_count_towards_limit(self):
+        processor = self.make_processor(self.REASONING + self.ANSWER)
+        self.assertEqual(list(processor._stream_questions("Текст защиты.", max_questions=1)), ["Что такое граф?"])
+        processor = self.make_processor(self.REASONING + self.ANSWER)
+        self.assertEqual(
+            list(processor._stream_questions("Текст защиты.")),
+            ["Что такое граф?", "Как работает поиск в ширину?"],
+        )
+
+    @override_settings(QUESTION_EMBEDDING_MODEL=None)
+    def test_rephrased_questions_from_other_windows_are_dropped(self):
+        processor = self.make_processor("")
+        processor._contexts = queue.Queue()
+        processor._contexts.put(FakeWindowLlama({
+            "Первое окно.": "1. Какие алгоритмы сортировки вы использовали?",
+            "Второе окно.": "1. Какие алгоритмы сортировки вы использовали в проекте?\n"
+                            "2. Почему выбрана база данных PostgreSQL?",
+        }))
+        windows = ["Первое окно.", "Второе окно."]
+        with mock.patch.object(LLMProcessor, 'split_windows', return_value=windows):
+            questions = list(processor._stream_questions(" ".join(windows)))
+
+        self.assertEqual(
+            questions,
+            ["Какие алгоритмы сортировки вы использовали?", "Почему выбрана база данных PostgreSQL?"],
+        )
+
+
+@override_settings(QUESTION_EMBEDDING_MODEL=None)
+class LexicalDeduplicationTest(SimpleTestCase):
+    # Пары из вопросов комиссии на защитах; порог QUESTION_DEDUP_LEXICAL_THRESHOLD подобран на них
+    REPHRASED = [
+        ("Какие алгоритмы сортировки вы использовали?", "Какой алгоритм сортировки вы использовали?"),
+        ("Какой алгоритм сортировки вы использовали?", "Какие алгоритмы сортировки использовались?"),
+        ("Почему вы выбрали PostgreSQL?", "Почему выбрали именно PostgreSQL?"),
+        ("Как вы тестировали приложение?", "Как тестировалось ваше приложение?"),
+        ("Сколько времени занимает обработка одной записи?", "Сколько времени занимает обработка записи?"),
+        ("Как вы обеспечиваете безопасность данных?", "Как обеспечивается безопасность данных?"),
+        ("Чем ваше решение отличается от существующих аналогов?", "Чем ваше решение отличается от аналогов?"),
+        ("Почему вы не использовали облачные сервисы?", "Почему не использовали облачные сервисы распознавания?"),
+    ]
+    DISTINCT = [
+        ("Что такое граф?", "Что такое дерево?"),
+        ("Что такое граф?", "Что такое взвешенный граф?"),
+        ("Какие алгоритмы сортировки вы использовали?", "Какие алгоритмы поиска вы использовали?"),
+        ("Почему вы выбрали PostgreSQL?", "Почему вы выбрали Django?"),
+        ("Как вы тестировали приложение?", "Как вы развертывали приложение?"),
+        ("Какая точность распознавания у модели Whisper?", "Какая скорость распознавания у модели Whisper?"),
+        ("Как работает поиск в ширину?", "Как работает поиск в глубину?"),
+        ("Кто был руководителем проекта?", "Кто был заказчиком проекта?"),
+        ("Сколько человек работало в команде?", "Сколько времени работала команда?"),
+    ]
+
+    def test_rephrased_pairs_are_merged(self):
+        for first, second in self.REPHRASED:
+            with self.subTest(first=first, second=second):
+                self.assertTrue(QuestionDeduplicationService.is_duplicate(second, [first]))
+
+    def test_distinct_but_similar_pairs_are_kept(self):
+        for first, second in self.DISTINCT:
+            with self.subTest(first=first, second=second):
+                self.assertFalse(QuestionDeduplicationService.is_duplicate(second, [first]))
+
+    def test_defense_questions_in_one_batch(self):
+        questions = list(dict.fromkeys(question for pair in self.REPHRASED[2:] + self.DISTINCT for question in pair))
+        rephrased = {second for _, second in self.REPHRASED[2:]}
+        self.assertEqual(
+            QuestionDeduplicationService.deduplicate(questions),
+            [question for question in questions if question not in rephrased],
+        )
+
+
+class FakeStreamingProcessor:
+    """Отдает вопросы по одному; после первого задание забирает другой воркер."""
+
+    def __init__(self, job):
+        self.job = job
+
+    def stream_questions(self, text, max_questions=None):
+        yield "Что такое граф?"
+        QuestionGenerationJob.objects.filter(id=self.job.id).update(worker="other-host:1")
+        yield "Как работает поиск в ширину?"
+
+
+def fake_process_questions(questions):
+    return [question.lower().rstrip('?') for question in questions]
+
+
+@mock.patch.object(TranscriptionService, 'process_questions', side_effect=fake_process_questions)
+class QuestionGenerationJobTest(TestCase):
+    def test_questions_are_lemmatized_like_transcript_questions(self, process_questions):
+        project = Project.objects.create(Title="Проект", Supervisor="Руководитель", Status="Новый")
+        QuestionGenerationService.submit(project.ID, "Текст защиты.")
+        job, = QuestionGenerationService.claim_batch(1)
+        processor = mock.Mock(**{'stream_questions.return_value': ["Что такое граф?", "Как обойти граф?"]})
+
+        QuestionGenerationService.run_job(processor, job)
+
+        self.assertEqual(
+            list(Question.objects.filter(ID_Project=project).order_by('ID').values_list('Text', flat=True)),
+            ["что такое граф", "как обойти граф"],
+        )
+        job.refresh_from_db()
+        self.assertEqual(job.questions, ["Что такое граф?", "Как обойти граф?"])
+        self.assertEqual(job.status, QuestionGenerationJob.Status.DONE)
+
+    def test_reclaimed_job_stops_writing(self, process_questions):
+        project = Project.objects.create(Title="Проект", Supervisor="Руководитель", Status="Новый")
+        QuestionGenerationService.submit(project.ID, "Текст защиты.")
+        job, = QuestionGenerationService.claim_batch(1)
+
+        QuestionGenerationService.run_job(FakeStreamingProcessor(job), job)
+
+        job.refresh_from_db()
+        self.assertEqual(Question.objects.filter(ID_Project=project).count(), 1)
+        self.assertEqual(len(job.questions), 1)
+        self.assertEqual(job.worker, "other-host:1")
+        self.assertEqual(job.status, QuestionGenerationJob.Status.RUNNING)
@@ -0,0 +1,33 @@
+import hashlib
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+class ContentHashMixin:
+    """Считает SHA-256 файла по мере получения кусков, без повторного чтения после загрузки."""
+
+    def new_file(self, *args, **kwargs):
+        # MemoryFileUploadHandler, забирая файл себе, выходит из new_file через
+        # StopFutureHandlers, поэтому hasher создается до вызова super()
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # MemoryFileUploadHandler пропускает данные дальше, если файл для него слишком большой
+        if getattr(self, 'activated', True):
+            self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.content_hash = self.hasher.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(ContentHashMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(ContentHashMixin, TemporaryFileUploadHandler):
+    pass
@@ -1,7 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from audio.services.audio_views import upload_audio
+from audio.services.audio_views import (
+    upload_audio,
+    audio_job_status,
+    upload_session_start,
+    upload_session_detail,
+    upload_session_finalize,
+)
 from audio.views.BitrixAuthView import BitrixAuthView
 from audio.views.commissionComposition_views import CommissionCompositionViewSet
 from audio.views.commission_views import CommissionViewSet, CommissionMemberViewSet
@@ -12,6 +18,7 @@ from audio.views.question_views import QuestionViewSet
 from audio.views.secretarySpecialization_views import SecretarySpecializationViewSet
 from audio.views.secretary_views import SecretaryViewSet
 from audio.views.student_views import StudentViewSet
+from audio.views.transcriptSegment_views import TranscriptSegmentViewSet
 
 
 router = DefaultRouter()
@@ -26,10 +33,15 @@ router.register(r'commissions', CommissionViewSet, basename='commission')
 router.register(r'commission_members', CommissionMemberViewSet, basename='commission_member')
 router.register(r'commission_compositions', CommissionCompositionViewSet, basename='commission_composition')
 router.register(r'defenses', DefenseViewSet, basename='defense')
+router.register(r'transcript_segments', TranscriptSegmentViewSet, basename='transcript_segment')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('upload-audio/', upload_audio, name='upload-audio'),
+    path('upload-sessions/', upload_session_start, name='upload-session-start'),
+    path('upload-sessions/<uuid:session_id>/', upload_session_detail, name='upload-session-detail'),
+    path('upload-sessions/<uuid:session_id>/finalize/', upload_session_finalize, name='upload-session-finalize'),
+    path('audio-jobs/<str:job_id>/', audio_job_status, name='audio-job-status'),
     path('api/accounts/bitrix-auth/', BitrixAuthView.as_view(), name='bitrix-auth'),
 ]
 
@@ -6,10 +6,12 @@ from ..filters import CommissionFilter
 from ..models import Commission, CommissionComposition, CommissionMember
 from ..serializers import CommissionSerializer, CommissionCompositionSerializer, CommissionMemberSerializer, \
     Commission_CompositionSerializer
+from .mixins import ConditionalGetMixin, QueryPlanMixin
 
 
-class CommissionCompositionViewSet(viewsets.ModelViewSet):
+class CommissionCompositionViewSet(ConditionalGetMixin, QueryPlanMixin, viewsets.ModelViewSet):
     queryset = CommissionComposition.objects.all()
+    version_models = [CommissionComposition, CommissionMember]
     serializer_class = Commission_CompositionSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['ID_Commission']
\ No newline at end of file
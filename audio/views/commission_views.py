@@ -5,16 +5,19 @@ from django_filters.rest_framework import DjangoFilterBackend
 from ..filters import CommissionFilter
 from ..models import Commission, CommissionComposition, CommissionMember
 from ..serializers import CommissionSerializer, CommissionCompositionSerializer, CommissionMemberSerializer
+from .mixins import ConditionalGetMixin, QueryPlanMixin, ResponseCacheMixin
 
 
-class CommissionViewSet(viewsets.ModelViewSet):
+class CommissionViewSet(ConditionalGetMixin, ResponseCacheMixin, QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Commission.objects.all()
+    version_models = [Commission, CommissionComposition, CommissionMember]
     serializer_class = CommissionSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = CommissionFilter
 
 
-class CommissionMemberViewSet(viewsets.ModelViewSet):
+class CommissionMemberViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = CommissionMember.objects.all()
+    version_models = [CommissionMember]
     serializer_class = CommissionMemberSerializer
 
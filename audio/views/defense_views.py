@@ -1,12 +1,20 @@
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status
 from audio.filters import DefenseScheduleFilter
-from audio.models import DefenseSchedule
+from audio.models import Commission, CommissionComposition, CommissionMember, DefenseSchedule, Protocol, Student
 from audio.serializers import DefenseScheduleSerializer, TodayDefenseQuerySerializer
+from audio.views.mixins import ConditionalGetMixin, QueryPlanMixin, ResponseCacheMixin
 
 
-class DefenseViewSet(viewsets.ModelViewSet):
+class DefenseViewSet(ConditionalGetMixin, ResponseCacheMixin, QueryPlanMixin, viewsets.ModelViewSet):
     queryset = DefenseSchedule.objects.all()
+    version_models = [DefenseSchedule, Commission, CommissionComposition, CommissionMember]
     serializer_class = DefenseScheduleSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = DefenseScheduleFilter  # Используем наш кастомный фильтр
+
+    def get_version_models(self):
+        # Фильтр по специализации идет через протоколы и студентов
+        if 'specialization_id' in self.request.query_params:
+            return self.version_models + [Protocol, Student]
+        return self.version_models
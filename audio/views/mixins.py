@@ -0,0 +1,120 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from rest_framework.response import Response
+
+from audio.services.query_plan_service import QueryPlanService
+from audio.services.response_cache_service import ResponseCacheService
+from audio.services.table_version_service import TableVersionService
+
+
+class QueryPlanMixin:
+    """
+    Добавляет к queryset вьюсета select_related/prefetch_related, выведенные
+    из его сериализатора (см. QueryPlanService), чтобы число запросов не росло
+    с количеством строк в ответе. План строится по сериализатору этого запроса,
+    поэтому учитывает ?fields= и ?expand=.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return QueryPlanService.plan(queryset, self.get_serializer())
+
+
+class TableVersionMixin:
+    """Версии таблиц version_models, от которых зависит ответ (один запрос на запрос)."""
+
+    version_models = []
+
+    def get_version_models(self):
+        return self.version_models
+
+    def get_table_versions(self):
+        if not hasattr(self, '_table_versions'):
+            self._table_versions = TableVersionService.get(self.get_version_models())
+        return self._table_versions
+
+
+class ConditionalGetMixin(TableVersionMixin):
+    """
+    ETag и Last-Modified для справочников по версиям таблиц version_models
+    (TableVersion, увеличиваются сигналами audio.signals). На If-None-Match
+    с тем же ETag ответ 304 отдается до запроса данных и сериализации.
+    """
+
+    def get_etag(self, request, versions):
+        key = "|".join([
+            self.__class__.__name__,
+            self.action or '',
+            request.get_full_path(),
+            request.accepted_renderer.format if getattr(request, 'accepted_renderer', None) else '',
+            ",".join(str(version) for version in versions),
+        ])
+        return f'"{hashlib.sha1(key.encode("utf-8")).hexdigest()}"'
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().retrieve, *args, **kwargs)
+
+    def conditional_response(self, request, view, *args, **kwargs):
+        versions, last_modified = self.get_table_versions()
+        etag = self.get_etag(request, versions)
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+            # Клиент может хранить ответ, но обязан перепроверять его через If-None-Match
+            patch_cache_control(response, no_cache=True)
+        return response
+
+
+class ResponseCacheMixin(TableVersionMixin):
+    """
+    Кэш готовых данных ответа list/retrieve. Ключ — вьюсет, действие, адрес
+    с параметрами фильтров, пользователь и версии таблиц version_models:
+    любое изменение этих таблиц (audio.signals) меняет ключ, и старые записи
+    больше не читаются, а истекают сами.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+    def get_response_cache_key(self, request):
+        # Время изменения тоже входит в ключ: номер версии, откаченный вместе
+        # с транзакцией, может повториться, а время — нет
+        versions, last_modified = self.get_table_versions()
+        key = "|".join([
+            last_modified.isoformat() if last_modified else '',
+            request.get_full_path(),
+            request.accepted_renderer.format if getattr(request, 'accepted_renderer', None) else '',
+            str(request.user.pk) if request.user.is_authenticated else 'anonymous',
+            ",".join(str(version) for version in versions),
+        ])
+        return f"response:{self.__class__.__name__}:{self.action}:{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
+
+    def cached_response(self, request, view, *args, **kwargs):
+        if not ResponseCacheService.is_enabled():
+            return view(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request)
+        data = ResponseCacheService.get(self.__class__.__name__, key)
+        if data is not None:
+            return Response(data)
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            ResponseCacheService.set(key, response.data)
+        return response
+
@@ -3,13 +3,16 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from ..filters import ProjectFilter
-from ..models import Project, Student, Protocol
+from ..models import Project, Student, Protocol, TranscriptSegment
+from ..services.table_version_service import TableVersionService
+from .mixins import ResponseCacheMixin
 from ..serializers import ProjectSerializer, UpdateDefenseTimeByProjectSerializer, \
     UpdateDefenseTimeEndByProjectSerializer
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(ResponseCacheMixin, viewsets.ModelViewSet):
     queryset = Project.objects.all()
+    version_models = [Project, Student, Protocol]  # фильтр по защите идет через студентов и протоколы
     serializer_class = ProjectSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = ProjectFilter
@@ -24,6 +27,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             updated = Protocol.objects.filter(
                 ID_Student__in=Student.objects.filter(ID_Project=project_id).values('ID')
             ).update(DefenseStartTime=defense_time)
+            TableVersionService.bump(Protocol)
 
             project = Project.objects.get(ID=project_id)
             if defense_time is None:
@@ -46,9 +50,21 @@ class ProjectViewSet(viewsets.ModelViewSet):
             updated = Protocol.objects.filter(
                 ID_Student__in=Student.objects.filter(ID_Project=project_id).values('ID')
             ).update(DefenseEndTime=defense_time)
+            TableVersionService.bump(Protocol)
 
             return Response({"message": "Протоколы успешно обновлены"}, status=status.HTTP_200_OK)
 
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['post'])
+    def reextract_questions(self, request, pk=None):
+        from ..task import reextract_questions_task
+
+        project = self.get_object()
+        if not TranscriptSegment.objects.filter(ID_Project=project.ID).exists():
+            return Response({"error": "У проекта нет сохраненной расшифровки"}, status=status.HTTP_400_BAD_REQUEST)
+
+        task = reextract_questions_task.delay(project.ID)
+        return Response({"message": "Вопросы извлекаются заново", "task_id": task.id}, status=status.HTTP_202_ACCEPTED)
+
@@ -4,9 +4,10 @@ from ..filters import ProtocolFilter
 from ..models import Protocol, Student
 from ..serializers import ProtocolSerializer, UpdateGradeSerializer
 from rest_framework import viewsets, status
+from .mixins import QueryPlanMixin
 
 
-class ProtocolViewSet(viewsets.ModelViewSet):
+class ProtocolViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Protocol.objects.all()
     serializer_class = ProtocolSerializer
     filter_backends = [DjangoFilterBackend]
@@ -1,12 +1,15 @@
 from django_filters.rest_framework import DjangoFilterBackend
+from ..filters import QuestionFilter
 from ..models import Question, Project
 from ..serializers import QuestionSerializer
 from rest_framework import viewsets
+from .mixins import QueryPlanMixin, ResponseCacheMixin
 
 
-class QuestionViewSet(viewsets.ModelViewSet):
+class QuestionViewSet(ResponseCacheMixin, QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Question.objects.all()
+    version_models = [Question]
     serializer_class = QuestionSerializer
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['ID_Project']
+    filterset_class = QuestionFilter
 
@@ -1,10 +1,13 @@
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets
+from audio.models import Specialization
 from audio.serializers import SecretarySpecialization, SecretarySpecializationSerializer
+from audio.views.mixins import ConditionalGetMixin, QueryPlanMixin, ResponseCacheMixin
 
 
-class SecretarySpecializationViewSet(viewsets.ModelViewSet):
+class SecretarySpecializationViewSet(ConditionalGetMixin, ResponseCacheMixin, QueryPlanMixin, viewsets.ModelViewSet):
     queryset = SecretarySpecialization.objects.all()
+    version_models = [SecretarySpecialization, Specialization]
     serializer_class = SecretarySpecializationSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['ID_Secretary']
\ No newline at end of file
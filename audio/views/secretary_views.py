@@ -3,9 +3,11 @@ from django_filters.rest_framework import DjangoFilterBackend
 from ..models import CommissionMember
 from ..serializers import CommissionMemberSerializer
 from ..filters import SecretaryFilter
+from .mixins import ResponseCacheMixin
 
-class SecretaryViewSet(viewsets.ModelViewSet):
+class SecretaryViewSet(ResponseCacheMixin, viewsets.ModelViewSet):
     queryset = CommissionMember.objects.all()
+    version_models = [CommissionMember]
     serializer_class = CommissionMemberSerializer
-    filter_backends = (DjangoFilterBackend)
+    filter_backends = [DjangoFilterBackend]
     filterset_class = SecretaryFilter
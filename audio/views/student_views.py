@@ -2,14 +2,15 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status
 from audio.filters import StudentFilter
 from audio.models import Student, Protocol
-from audio.serializers import StudentSerializer, UpdateGradeSerializer
+from audio.serializers import BulkGradeSerializer, StudentSerializer, UpdateGradeSerializer
+from audio.services.grade_service import GradeService
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from audio.views.mixins import QueryPlanMixin
 
-class StudentViewSet(viewsets.ModelViewSet):
-    queryset = Student.objects.all().select_related(
-        'ID_Group', 'ID_Specialization', 'ID_Project'
-    ).prefetch_related('protocol_set')
+class StudentViewSet(QueryPlanMixin, viewsets.ModelViewSet):
+    # select_related и последняя оценка добавляются по StudentSerializer (QueryPlanMixin)
+    queryset = Student.objects.all()
     serializer_class = StudentSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = StudentFilter
@@ -22,14 +23,27 @@ class StudentViewSet(viewsets.ModelViewSet):
         student_id = serializer.validated_data['ID_Student']
         new_grade = serializer.validated_data['Grade']
 
-        try:
-            protocol = Protocol.objects.get(ID_Student=student_id)
-            protocol.Grade = new_grade
-            protocol.save()
-            return Response({"status": "Оценка обновлена!"})
-
-        except Protocol.DoesNotExist:
+        # У студента может быть несколько протоколов: оценка ставится в последний
+        protocol = Protocol.objects.filter(ID_Student=student_id).order_by('-ID').first()
+        if protocol is None:
             return Response(
                 {"error": "Протокол для этого студента не найден"},
                 status=status.HTTP_404_NOT_FOUND
-            )
\ No newline at end of file
+            )
+        protocol.Grade = new_grade
+        protocol.save(update_fields=['Grade'])
+        return Response({"status": "Оценка обновлена!"})
+
+    @action(detail=False, methods=['patch'], serializer_class=BulkGradeSerializer)
+    def bulk_update_grade(self, request):
+        # [{"ID_Student": 1, "Grade": "5"}, ...] — все оценки дня защиты одним запросом
+        serializer = self.get_serializer(data=request.data, many=True, allow_empty=False)
+        serializer.is_valid(raise_exception=True)
+
+        updated, results = GradeService.bulk_update(serializer.validated_data)
+        if not updated:
+            return Response(
+                {"error": "Оценки не сохранены: исправьте строки с ошибками", "results": results},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({"status": "Оценки обновлены!", "results": results})
\ No newline at end of file
@@ -0,0 +1,12 @@
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import viewsets
+from ..filters import TranscriptSegmentFilter
+from ..models import TranscriptSegment
+from ..serializers import TranscriptSegmentSerializer
+
+
+class TranscriptSegmentViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = TranscriptSegment.objects.order_by('ID_Project', 'Start', 'ID')
+    serializer_class = TranscriptSegmentSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = TranscriptSegmentFilter
@@ -0,0 +1,5 @@
+# Приложение Celery загружается вместе с Django, чтобы задачи из веб-процесса
+# отправлялись с настройками CELERY_* (брокер, маршруты очередей)
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
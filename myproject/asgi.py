@@ -13,4 +13,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Импорт после инициализации Django: обработчику нужны модели
+from audio.services.live_transcription_views import live_transcription  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # WebSocket — расшифровка во время защиты, остальное обрабатывает Django
+    if scope['type'] == 'websocket':
+        return await live_transcription(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -1,10 +1,77 @@
 from __future__ import absolute_import
 import os
+import logging
 from celery import Celery
+from celery.signals import celeryd_after_setup, worker_process_init
+from celery.worker.control import inspect_command
+
+logger = logging.getLogger(__name__)
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
 
 app = Celery('myproject')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.conf.broker_connection_retry_on_startup = True
-app.autodiscover_tasks(['audio'])
\ No newline at end of file
+app.autodiscover_tasks(['audio'])
+
+
+# Очереди, которые слушает этот воркер (заполняется до запуска дочерних процессов)
+consumed_queues = set()
+
+
+@celeryd_after_setup.connect
+def remember_queues(sender, instance, **kwargs):
+    consumed_queues.update(instance.app.amqp.queues.consume_from.keys())
+
+
+@worker_process_init.connect
+def warmup_models(**kwargs):
+    # Загружаем модели заранее, чтобы первая задача не ждала чтения весов,
+    # и только в воркерах тех очередей, которым они нужны
+    from django.conf import settings
+    if not getattr(settings, 'WHISPER_WARMUP', True):
+        return
+    try:
+        if 'asr' in consumed_queues:
+            from audio.services.model_registry import WhisperModelRegistry
+            WhisperModelRegistry.warmup()
+        if 'nlp' in consumed_queues:
+            from audio.services.transcription_service import TranscriptionService
+            TranscriptionService.get_nlp()
+        if 'llm' in consumed_queues:
+            from audio.services.LLMProcessor_service import LLMProcessor
+            LLMProcessor.get_instance()
+    except Exception as exc:
+        logger.error(f"Model warmup failed: {str(exc)}")
+
+
+@worker_process_init.connect
+def release_llm_jobs(**kwargs):
+    # Новый процесс воркера llm (после падения прежнего) возвращает брошенные
+    # задания в очередь и будит себя, не дожидаясь следующей записи
+    if 'llm' not in consumed_queues:
+        return
+    try:
+        from audio.services.question_generation_service import QuestionGenerationService
+        from audio.task import generate_questions_task
+        if QuestionGenerationService.release_abandoned():
+            generate_questions_task.delay()
+    except Exception as exc:
+        logger.error(f"Releasing LLM jobs failed: {str(exc)}")
+
+
+@inspect_command()
+def whisper_stats(state):
+    # celery -A myproject inspect whisper_stats
+    # Команда выполняется в главном процессе, а модели загружены в дочерних:
+    # читаем то, что опубликовали текущие дочерние процессы (pool solo/threads — сам процесс)
+    from audio.services.model_registry import WhisperModelRegistry
+    pids = state.consumer.pool.info.get('processes') or [os.getpid()]
+    return WhisperModelRegistry.shared_stats(pids)
+
+
+@inspect_command()
+def llm_cache_stats(state):
+    # celery -A myproject inspect llm_cache_stats
+    from audio.services.llm_cache_service import LLMResultCache
+    return LLMResultCache.stats()